@@ -3,12 +3,19 @@ Core query fragmentation logic
 """
 
 import logging
+import os
 import re
+import threading
 import time
-from typing import Any, Dict, List, Optional
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from operator import attrgetter, itemgetter
+from types import MappingProxyType
+from typing import Any, Dict, List, Optional, cast
 
 from src.detection.engine import DetectionEngine
-from src.detection.models import DetectionReport
+from src.detection.models import DetectionReport, PIIEntityType
 from src.fragmentation.models import (
     FragmentationConfig,
     FragmentationMetrics,
@@ -17,16 +24,89 @@ from src.fragmentation.models import (
     FragmentationStrategy,
     FragmentationType,
     QueryFragment,
+    _next_fragment_id,
 )
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of detection reports memoized per fragmenter
+_DETECTION_CACHE_SIZE = 256
+
+# Enum values resolved once instead of through the enum descriptors on every use
+_STRATEGY_STR = {strategy: strategy.value for strategy in FragmentationStrategy}
+_ENTITY_TYPE_STR = {entity_type: entity_type.value for entity_type in PIIEntityType}
+
+# Bytes that can't start PII or code on their own: lowercase ASCII letters, whitespace
+# and prose punctuation. Digits, capitals, symbols like @ # { } = ; and any non-ASCII
+# byte are left out, so their presence sends a query through full detection.
+_PLAIN_TEXT_BYTES = (
+    b"abcdefghijklmnopqrstuvwxyz"
+    b" \t\n\r"
+    b".,!?'\"-"
+)
+
+# C-level sort keys for PII entities and code block dicts
+_ENTITY_START = attrgetter("start")
+_BLOCK_START = itemgetter("start")
+
+
+def _split_words_by_length(text: str, max_length: int) -> List[str]:
+    """
+    Split text into whitespace-normalized chunks of at most max_length characters
+
+    Words are never broken; a single word longer than the limit becomes its own
+    chunk. The text is normalized once and each boundary is then located with
+    str.rfind, so the loop runs once per chunk rather than once per word.
+
+    Args:
+        text: Text to split
+        max_length: Maximum chunk length in characters
+
+    Returns:
+        Chunks in original order
+    """
+    normalized = ' '.join(text.split())
+    total = len(normalized)
+    chunks = []
+    position = 0
+    # The first chunk historically reserves one character for a trailing space
+    limit = max_length - 1
+
+    while position < total:
+        if total - position <= limit:
+            chunks.append(normalized[position:])
+            break
+
+        boundary = normalized.rfind(' ', position, position + limit + 1)
+        if boundary <= position:
+            # Single word longer than the limit: keep it whole
+            boundary = normalized.find(' ', position + 1)
+            if boundary == -1:
+                chunks.append(normalized[position:])
+                break
+
+        chunks.append(normalized[position:boundary])
+        position = boundary + 1
+        limit = max_length
+
+    return chunks
+
 
 class QueryFragmenter:
     """
     Core class responsible for fragmenting queries based on sensitivity analysis
     """
 
+    # Available fragmentation strategies, mapped to the method implementing each
+    _STRATEGY_METHODS = MappingProxyType({
+        FragmentationStrategy.NONE: "_no_fragmentation",
+        FragmentationStrategy.PII_ISOLATION: "_pii_isolation_strategy",
+        FragmentationStrategy.CODE_ISOLATION: "_code_isolation_strategy",
+        FragmentationStrategy.SEMANTIC_SPLIT: "_semantic_split_strategy",
+        FragmentationStrategy.MAXIMUM_ISOLATION: "_maximum_isolation_strategy",
+        FragmentationStrategy.LENGTH_BASED: "_length_based_strategy",
+    })
+
     def __init__(self, config: Optional[FragmentationConfig] = None):
         """
         Initialize the query fragmenter
@@ -36,26 +116,20 @@ class QueryFragmenter:
         """
         self.config = config or FragmentationConfig()
         self.detection_engine = DetectionEngine()
+        self._detection_cache: OrderedDict[str, DetectionReport] = OrderedDict()
+        self._detection_cache_lock = threading.Lock()
 
-        # Available fragmentation strategies
-        self.strategies = {
-            FragmentationStrategy.NONE: self._no_fragmentation,
-            FragmentationStrategy.PII_ISOLATION: self._pii_isolation_strategy,
-            FragmentationStrategy.CODE_ISOLATION: self._code_isolation_strategy,
-            FragmentationStrategy.SEMANTIC_SPLIT: self._semantic_split_strategy,
-            FragmentationStrategy.MAXIMUM_ISOLATION: self._maximum_isolation_strategy,
-            FragmentationStrategy.LENGTH_BASED: self._length_based_strategy,
-        }
-
-        logger.info(f"QueryFragmenter initialized with {len(self.strategies)} strategies")
+        logger.info(f"QueryFragmenter initialized with {len(self._STRATEGY_METHODS)} strategies")
 
-    def fragment_query(self, query: str, config: Optional[FragmentationConfig] = None) -> FragmentationResult:
+    def fragment_query(self, query: str, config: Optional[FragmentationConfig] = None,
+                       bypass_cache: bool = False) -> FragmentationResult:
         """
         Fragment a query based on its sensitivity analysis
 
         Args:
             query: The query text to fragment
             config: Optional custom configuration
+            bypass_cache: Always run detection instead of reusing a cached report
 
         Returns:
             FragmentationResult containing fragments and metadata
@@ -63,7 +137,7 @@ class QueryFragmenter:
         Raises:
             ValueError: If query is empty or invalid
         """
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
 
         # Validate input
         if not query or not query.strip():
@@ -71,46 +145,60 @@ class QueryFragmenter:
 
         query = query.strip()
         effective_config = config or self.config
+        emit_metrics = effective_config.emit_metrics
+
+        if effective_config.enable_fast_precheck and self._is_plain_text(query, effective_config):
+            return self._trivial_result(
+                query, {"precheck": True}, effective_config.use_uuid_fragment_ids
+            )
 
         try:
             # Step 1: Detect sensitive content
-            detection_start = time.time()
-            detection_report = self.detection_engine.detect(query)
-            detection_time = (time.time() - detection_start) * 1000
+            detection_start_ns = time.perf_counter_ns() if emit_metrics else 0
+            detection_report = self._detect(query, bypass_cache)
 
             # Step 2: Select fragmentation strategy
-            strategy_start = time.time()
+            strategy_start_ns = time.perf_counter_ns() if emit_metrics else 0
             strategy = self._get_fragmentation_strategy(detection_report, len(query))
-            strategy_time = (time.time() - strategy_start) * 1000
 
             # Step 3: Apply fragmentation strategy
-            fragmentation_start = time.time()
-            fragments = self.strategies[strategy](query, detection_report, effective_config)
-            fragmentation_time = (time.time() - fragmentation_start) * 1000
-
-            # Step 4: Create result
-            total_time = (time.time() - start_time) * 1000
-
-            result = FragmentationResult(
-                original_query=query,
-                fragments=fragments,
-                strategy_used=str(strategy),
-                fragmentation_metadata={
-                    "detection_report": detection_report.model_dump(),
-                    "config_used": effective_config.model_dump(),
-                    "metrics": FragmentationMetrics(
-                        fragmentation_time_ms=fragmentation_time,
-                        detection_time_ms=detection_time,
-                        strategy_selection_time_ms=strategy_time,
-                        total_processing_time_ms=total_time,
-                        fragments_created=len(fragments),
-                        sensitive_data_isolated=any(f.contains_sensitive_data for f in fragments),
-                        privacy_preservation_score=self._calculate_privacy_score(detection_report, fragments)
-                    ).model_dump()
-                }
-            )
-
-            logger.info(f"Query fragmented using {strategy} strategy: {len(fragments)} fragments created")
+            fragmentation_start_ns = time.perf_counter_ns() if emit_metrics else 0
+            if strategy is FragmentationStrategy.NONE:
+                # Common nothing-to-isolate path: skip dispatch and result validation
+                result = self._trivial_result(
+                    query, use_uuid_id=effective_config.use_uuid_fragment_ids
+                )
+                fragmented_ns = time.perf_counter_ns() if emit_metrics else 0
+            else:
+                fragments = getattr(self, self._STRATEGY_METHODS[strategy])(
+                    query, detection_report, effective_config
+                )
+                fragmented_ns = time.perf_counter_ns() if emit_metrics else 0
+                # Step 4: Create result
+                result = FragmentationResult(
+                    original_query=query,
+                    fragments=fragments,
+                    strategy_used=_STRATEGY_STR[strategy]
+                )
+            # Total time includes building the result
+            end_ns = time.perf_counter_ns() if emit_metrics else 0
+
+            metadata = result.fragmentation_metadata
+            if emit_metrics:
+                metadata["metrics"] = FragmentationMetrics.model_construct(
+                    fragmentation_time_ms=(fragmented_ns - fragmentation_start_ns) / 1_000_000,
+                    detection_time_ms=(strategy_start_ns - detection_start_ns) / 1_000_000,
+                    strategy_selection_time_ms=(fragmentation_start_ns - strategy_start_ns) / 1_000_000,
+                    total_processing_time_ms=(end_ns - start_ns) / 1_000_000,
+                    fragments_created=result.total_fragments,
+                    sensitive_data_isolated=result.sensitive_fragment_count > 0,
+                    privacy_preservation_score=self._calculate_privacy_score(detection_report, result.fragments)
+                ).model_dump()
+            if effective_config.emit_full_metadata:
+                metadata["detection_report"] = detection_report.model_dump()
+                metadata["config_used"] = effective_config.model_dump()
+
+            logger.info(f"Query fragmented using {strategy} strategy: {result.total_fragments} fragments created")
             return result
 
         except Exception as e:
@@ -128,21 +216,138 @@ class QueryFragmenter:
             FragmentationResult
         """
         if request.force_strategy:
-            # Override strategy selection if forced
-            fragments = self.strategies[request.force_strategy](
+            # Override strategy selection if forced (enum values are stored as plain strings)
+            strategy = FragmentationStrategy(request.force_strategy)
+            fragments = getattr(self, self._STRATEGY_METHODS[strategy])(
                 request.query,
-                self.detection_engine.detect(request.query),
+                self._detect(request.query, request.bypass_cache),
                 request.config or self.config
             )
 
             return FragmentationResult(
                 original_query=request.query,
                 fragments=fragments,
-                strategy_used=str(request.force_strategy),
+                strategy_used=_STRATEGY_STR[strategy],
                 fragmentation_metadata={"forced_strategy": True}
             )
 
-        return self.fragment_query(request.query, request.config)
+        return self.fragment_query(request.query, request.config, bypass_cache=request.bypass_cache)
+
+    def fragment_batch(self, requests: List[FragmentationRequest],
+                       max_workers: Optional[int] = None) -> List[FragmentationResult]:
+        """
+        Fragment several requests, running detection once per unique query
+
+        Requests are grouped by the query text detection will see; each group
+        is handled by one worker, so the first request of a group runs
+        detection and the rest reuse the cached report.
+
+        Args:
+            requests: Requests to fragment
+            max_workers: Upper bound on worker threads (defaults to CPU count)
+
+        Returns:
+            FragmentationResult for each request, in request order
+
+        Raises:
+            ValueError: If any request has an empty query
+        """
+        groups: Dict[str, List[int]] = {}
+        for index, request in enumerate(requests):
+            # fragment_query strips the query before detection; forced strategies don't
+            key = request.query if request.force_strategy else request.query.strip()
+            groups.setdefault(key, []).append(index)
+
+        results: List[Optional[FragmentationResult]] = [None] * len(requests)
+
+        def fragment_group(indices: List[int]) -> None:
+            for index in indices:
+                results[index] = self.fragment_request(requests[index])
+
+        workers = min(len(groups), max_workers or os.cpu_count() or 1)
+        if workers <= 1:
+            for indices in groups.values():
+                fragment_group(indices)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                # Consume the iterator so worker exceptions propagate
+                list(pool.map(fragment_group, groups.values()))
+
+        # Every slot has been filled by its group's worker
+        return cast(List[FragmentationResult], results)
+
+    def _detect(self, query: str, bypass_cache: bool = False) -> DetectionReport:
+        """
+        Run sensitivity detection, reusing reports for recently seen queries
+
+        Args:
+            query: The query text to analyze
+            bypass_cache: Skip the cache lookup and always run detection
+
+        Returns:
+            DetectionReport owned by the caller
+        """
+        if not bypass_cache:
+            with self._detection_cache_lock:
+                cached = self._detection_cache.get(query)
+                if cached is not None:
+                    self._detection_cache.move_to_end(query)
+            if cached is not None:
+                # Hand out a copy so callers can't corrupt the cached report
+                return cached.model_copy(deep=True)
+
+        report = self.detection_engine.detect(query)
+        snapshot = report.model_copy(deep=True)
+
+        with self._detection_cache_lock:
+            self._detection_cache[query] = snapshot
+            self._detection_cache.move_to_end(query)
+            if len(self._detection_cache) > _DETECTION_CACHE_SIZE:
+                self._detection_cache.popitem(last=False)
+
+        return report
+
+    def _is_plain_text(self, query: str, config: FragmentationConfig) -> bool:
+        """
+        Check whether a query can skip detection entirely
+
+        A query qualifies when it fits in one fragment, contains only lowercase
+        letters, whitespace and prose punctuation, and mentions none of the
+        detection engine's sensitive keywords. The character check is a single
+        C-level pass (bytes.translate deleting the plain bytes).
+        """
+        if len(query) > config.max_fragment_size:
+            return False
+
+        encoded = query.encode("utf-8", "surrogatepass")
+        if encoded.translate(None, _PLAIN_TEXT_BYTES):
+            return False
+
+        return not any(keyword in query for keyword in self.detection_engine.sensitive_keywords)
+
+    def _trivial_result(self, query: str,
+                        fragmentation_metadata: Optional[Dict[str, Any]] = None,
+                        use_uuid_id: bool = False) -> FragmentationResult:
+        """
+        Build the single-fragment result for a query that needs no fragmentation
+
+        Every value is produced here, so the result is constructed without
+        validation; model_construct bypasses __init__, hence the explicit counts.
+        """
+        return FragmentationResult.model_construct(
+            original_query=query,
+            fragments=[self._create_fragment(
+                content=query,
+                fragment_type=FragmentationType.GENERAL,
+                contains_sensitive_data=False,
+                order_index=0,
+                use_uuid_id=use_uuid_id
+            )],
+            strategy_used=_STRATEGY_STR[FragmentationStrategy.NONE],
+            total_fragments=1,
+            sensitive_fragment_count=0,
+            fragmentation_metadata=fragmentation_metadata if fragmentation_metadata is not None else {}
+        )
 
     def _get_fragmentation_strategy(self, detection_report: DetectionReport, query_length: Optional[int] = None) -> FragmentationStrategy:
         """
@@ -185,7 +390,8 @@ class QueryFragmenter:
             content=query,
             fragment_type=FragmentationType.GENERAL,
             contains_sensitive_data=False,
-            order_index=0
+            order_index=0,
+            use_uuid_id=config.use_uuid_fragment_ids
         )]
 
     def _pii_isolation_strategy(self, query: str, detection_report: DetectionReport,
@@ -206,18 +412,19 @@ class QueryFragmenter:
                 content=query,
                 fragment_type=FragmentationType.GENERAL,
                 contains_sensitive_data=False,
-                order_index=0
+                order_index=0,
+                use_uuid_id=config.use_uuid_fragment_ids
             )]
 
         # Sort PII entities by start position
-        sorted_entities = sorted(detection_report.pii_entities, key=lambda x: x.start)
+        sorted_entities = sorted(detection_report.pii_entities, key=_ENTITY_START)
         
         # Create entity-specific placeholders for consistent anonymization
         entity_map = {}
         placeholder_counter = {}
         
         for entity in sorted_entities:
-            entity_type = entity.type.value
+            entity_type = _ENTITY_TYPE_STR[entity.type]
             if entity_type not in placeholder_counter:
                 placeholder_counter[entity_type] = 1
             else:
@@ -229,7 +436,7 @@ class QueryFragmenter:
 
         # Strategy 1: Create anonymized version of the complete query
         anonymized_query = query
-        for entity in sorted(sorted_entities, key=lambda x: x.start, reverse=True):
+        for entity in sorted(sorted_entities, key=_ENTITY_START, reverse=True):
             placeholder = entity_map[entity.text]
             anonymized_query = (
                 anonymized_query[:entity.start] + 
@@ -247,7 +454,8 @@ class QueryFragmenter:
                 "is_anonymized": True,
                 "entity_mappings": entity_map,
                 "semantic_context": "preserved"
-            }
+            },
+            use_uuid_id=config.use_uuid_fragment_ids
         ))
 
         # Strategy 2: Create context fragments for complex queries
@@ -266,7 +474,8 @@ class QueryFragmenter:
                             "is_anonymized": True,
                             "context_chunk": i,
                             "parent_query": "anonymized"
-                        }
+                        },
+                        use_uuid_id=config.use_uuid_fragment_ids
                     ))
 
         return fragments
@@ -309,11 +518,12 @@ class QueryFragmenter:
                 content=query,
                 fragment_type=FragmentationType.GENERAL,
                 contains_sensitive_data=False,
-                order_index=0
+                order_index=0,
+                use_uuid_id=config.use_uuid_fragment_ids
             )]
 
         # Sort code blocks by start position
-        code_blocks = sorted(detection_report.code_detection.code_blocks, key=lambda x: x["start"])
+        code_blocks = sorted(detection_report.code_detection.code_blocks, key=_BLOCK_START)
 
         order_index = 0
         last_end = 0
@@ -323,14 +533,11 @@ class QueryFragmenter:
 
             # Add text before code block
             if start > last_end:
-                text_content = query[last_end:start].strip()
-                if text_content:
-                    fragments.append(self._create_fragment(
-                        content=text_content,
-                        fragment_type=FragmentationType.GENERAL,
-                        contains_sensitive_data=False,
-                        order_index=order_index
-                    ))
+                text_fragment = self._create_text_span_fragment(
+                    query, last_end, start, order_index, config.use_uuid_fragment_ids
+                )
+                if text_fragment:
+                    fragments.append(text_fragment)
                     order_index += 1
 
             # Add code block
@@ -343,77 +550,111 @@ class QueryFragmenter:
                 metadata={
                     "language": block.get("language"),
                     "confidence": block.get("confidence", 0.0)
-                }
+                },
+                use_uuid_id=config.use_uuid_fragment_ids
             ))
             order_index += 1
             last_end = end
 
         # Add remaining text after last code block
         if last_end < len(query):
-            remaining_text = query[last_end:].strip()
-            if remaining_text:
-                fragments.append(self._create_fragment(
-                    content=remaining_text,
-                    fragment_type=FragmentationType.GENERAL,
-                    contains_sensitive_data=False,
-                    order_index=order_index
-                ))
+            text_fragment = self._create_text_span_fragment(
+                query, last_end, len(query), order_index, config.use_uuid_fragment_ids
+            )
+            if text_fragment:
+                fragments.append(text_fragment)
 
         return fragments
 
+    def _create_text_span_fragment(self, query: str, start: int, end: int,
+                                   order_index: int,
+                                   use_uuid_id: bool = False) -> Optional[QueryFragment]:
+        """
+        Create a general fragment from query[start:end] with surrounding whitespace stripped
+
+        The stripped text's offsets in the original query are kept in the fragment
+        metadata so detection results can be scoped to it later.
+
+        Returns:
+            The fragment, or None if the span is only whitespace
+        """
+        segment = query[start:end]
+        text_content = segment.strip()
+        if not text_content:
+            return None
+
+        original_start = start + len(segment) - len(segment.lstrip())
+        return self._create_fragment(
+            content=text_content,
+            fragment_type=FragmentationType.GENERAL,
+            contains_sensitive_data=False,
+            order_index=order_index,
+            metadata={
+                "original_start": original_start,
+                "original_end": original_start + len(text_content)
+            },
+            use_uuid_id=use_uuid_id
+        )
+
     def _semantic_split_strategy(self, query: str, detection_report: DetectionReport,
                                config: FragmentationConfig) -> List[QueryFragment]:
         """Split query at semantic boundaries"""
-        fragments = []
 
         # Simple sentence-based splitting for now
         sentences = re.split(r'[.!?]+', query)
         sentences = [s.strip() for s in sentences if s.strip()]
+        fragments: List[Optional[QueryFragment]] = [None] * len(sentences)
+
+        # Lowercase every entity once instead of once per sentence
+        entities_lower = [entity.text.lower() for entity in detection_report.named_entities]
 
         for i, sentence in enumerate(sentences):
             # Check if this sentence contains sensitive entities
             contains_sensitive = False
-            if detection_report.named_entities:
-                for entity in detection_report.named_entities:
-                    if entity.text.lower() in sentence.lower():
-                        contains_sensitive = True
-                        break
+            if entities_lower:
+                sentence_lower = sentence.lower()
+                contains_sensitive = any(entity in sentence_lower for entity in entities_lower)
 
-            fragments.append(self._create_fragment(
+            fragments[i] = self._create_fragment(
                 content=sentence,
                 fragment_type=FragmentationType.SEMANTIC,
                 contains_sensitive_data=contains_sensitive,
                 order_index=i,
-                provider_hint="claude" if contains_sensitive else None
-            ))
+                provider_hint="claude" if contains_sensitive else None,
+                use_uuid_id=config.use_uuid_fragment_ids
+            )
 
-        return fragments
+        # Every slot has been filled, one per sentence
+        return cast(List[QueryFragment], fragments)
 
     def _maximum_isolation_strategy(self, query: str, detection_report: DetectionReport,
                                   config: FragmentationConfig) -> List[QueryFragment]:
         """Maximum fragmentation for high sensitivity queries"""
-        fragments = []
+        fragments: List[QueryFragment] = []
 
         # Combine PII and code isolation strategies
         if detection_report.code_detection.has_code:
             code_fragments = self._code_isolation_strategy(query, detection_report, config)
             # Further fragment text portions if they contain PII
             for fragment in code_fragments:
-                if fragment.fragment_type == "text" and detection_report.has_pii:
-                    # Re-analyze this text fragment for PII
-                    text_detection = self.detection_engine.detect(fragment.content)
-                    if text_detection.has_pii:
-                        pii_fragments = self._pii_isolation_strategy(
-                            fragment.content, text_detection, config
-                        )
-                        # Update order indices
-                        for pii_frag in pii_fragments:
-                            pii_frag.order_index = len(fragments)
-                            fragments.append(pii_frag)
-                    else:
-                        fragments.append(fragment)
+                text_report = None
+                if fragment.fragment_type == FragmentationType.GENERAL and detection_report.has_pii:
+                    # Without code blocks the single fragment is the whole query
+                    text_report = self._scope_detection_report(
+                        detection_report,
+                        fragment.metadata.get("original_start", 0),
+                        fragment.metadata.get("original_end", len(query))
+                    )
+
+                if text_report is not None and text_report.has_pii:
+                    pii_fragments = self._pii_isolation_strategy(fragment.content, text_report, config)
                 else:
-                    fragments.append(fragment)
+                    pii_fragments = [fragment]
+
+                # Renumber so order stays consistent across the combined fragments
+                for pii_frag in pii_fragments:
+                    pii_frag.order = len(fragments)
+                    fragments.append(pii_frag)
         elif detection_report.has_pii:
             fragments = self._pii_isolation_strategy(query, detection_report, config)
         else:
@@ -428,7 +669,8 @@ class QueryFragmenter:
                     fragment.content,
                     config.max_fragment_size,
                     fragment.contains_sensitive_data,
-                    fragment.fragment_type
+                    fragment.fragment_type,
+                    config.use_uuid_fragment_ids
                 )
                 final_fragments.extend(sub_fragments)
             else:
@@ -436,75 +678,78 @@ class QueryFragmenter:
 
         return final_fragments
 
+    def _scope_detection_report(self, detection_report: DetectionReport,
+                                start: int, end: int) -> DetectionReport:
+        """
+        Restrict a detection report's PII entities to the span [start, end)
+
+        Entity offsets are shifted to be relative to the span, so the scoped
+        report can be applied to the span's text without running detection again.
+        """
+        pii_entities = [
+            entity.model_copy(update={"start": entity.start - start, "end": entity.end - start})
+            for entity in detection_report.pii_entities
+            if entity.start >= start and entity.end <= end
+        ]
+        return detection_report.model_copy(update={
+            "pii_entities": pii_entities,
+            "has_pii": bool(pii_entities)
+        })
+
     def _length_based_strategy(self, query: str, detection_report: DetectionReport,
                              config: FragmentationConfig) -> List[QueryFragment]:
         """Split query based on length limits"""
-        return self._split_by_length(query, config.max_fragment_size, False, FragmentationType.GENERAL)
+        return self._split_by_length(
+            query, config.max_fragment_size, False, FragmentationType.GENERAL,
+            config.use_uuid_fragment_ids
+        )
 
     def _split_by_length(self, text: str, max_length: int, contains_sensitive: bool,
-                        fragment_type: FragmentationType) -> List[QueryFragment]:
+                        fragment_type: FragmentationType,
+                        use_uuid_id: bool = False) -> List[QueryFragment]:
         """Split text into chunks based on length"""
-        fragments = []
-
         if len(text) <= max_length:
             return [self._create_fragment(
                 content=text,
                 fragment_type=fragment_type,
                 contains_sensitive_data=contains_sensitive,
-                order_index=0
+                order_index=0,
+                use_uuid_id=use_uuid_id
             )]
 
-        # Split preserving word boundaries
-        words = text.split()
-        current_chunk = []
-        current_length = 0
-        order_index = 0
-
-        for word in words:
-            word_length = len(word) + 1  # +1 for space
-
-            if current_length + word_length > max_length and current_chunk:
-                # Create fragment from current chunk
-                chunk_text = ' '.join(current_chunk)
-                fragments.append(self._create_fragment(
-                    content=chunk_text,
-                    fragment_type=fragment_type,
-                    contains_sensitive_data=contains_sensitive,
-                    order_index=order_index
-                ))
-
-                current_chunk = [word]
-                current_length = len(word)
-                order_index += 1
-            else:
-                current_chunk.append(word)
-                current_length += word_length
-
-        # Add remaining chunk
-        if current_chunk:
-            chunk_text = ' '.join(current_chunk)
-            fragments.append(self._create_fragment(
-                content=chunk_text,
+        # Split preserving word boundaries; chunk count is known up front
+        return [
+            self._create_fragment(
+                content=chunk,
                 fragment_type=fragment_type,
                 contains_sensitive_data=contains_sensitive,
-                order_index=order_index
-            ))
-
-        return fragments
+                order_index=order_index,
+                use_uuid_id=use_uuid_id
+            )
+            for order_index, chunk in enumerate(_split_words_by_length(text, max_length))
+        ]
 
     def _create_fragment(self, content: str, fragment_type: FragmentationType = FragmentationType.GENERAL,
                         contains_sensitive_data: bool = False,
                         provider_hint: Optional[str] = None,
                         order_index: int = 0,
-                        metadata: Optional[Dict[str, Any]] = None) -> QueryFragment:
-        """Create a QueryFragment with the given parameters"""
-        return QueryFragment(
+                        metadata: Optional[Dict[str, Any]] = None,
+                        use_uuid_id: bool = False) -> QueryFragment:
+        """
+        Create a QueryFragment with the given parameters
+
+        Arguments are produced internally and already have the right types,
+        so validation is skipped. The fragment ID is a UUID4 when use_uuid_id
+        is set and the model's counter-based ID otherwise.
+        """
+        return QueryFragment.model_construct(
+            fragment_id=str(uuid.uuid4()) if use_uuid_id else _next_fragment_id(),
             content=content,
             fragment_type=fragment_type,
             contains_sensitive_data=contains_sensitive_data,
             provider_hint=provider_hint,
-            order_index=order_index,
-            metadata=metadata or {}
+            order=order_index,
+            metadata=metadata if metadata is not None else {}
         )
 
     def _calculate_privacy_score(self, detection_report: DetectionReport,
@@ -525,15 +770,22 @@ class QueryFragmenter:
         # Base score
         score = 0.5
 
+        # Count sensitive fragments and sensitive fragments hinted to Claude in one pass
+        sensitive_count = 0
+        claude_hints = 0
+        for fragment in fragments:
+            if fragment.contains_sensitive_data:
+                sensitive_count += 1
+                if fragment.provider_hint == "claude":
+                    claude_hints += 1
+
         # Bonus for isolating sensitive data
-        sensitive_fragments = [f for f in fragments if f.contains_sensitive_data]
-        if sensitive_fragments and detection_report.sensitivity_score > 0:
-            isolation_ratio = len(sensitive_fragments) / len(fragments)
+        if sensitive_count and detection_report.sensitivity_score > 0:
+            isolation_ratio = sensitive_count / len(fragments)
             if isolation_ratio < 0.5:  # Most fragments are non-sensitive
                 score += 0.3
 
         # Bonus for using appropriate provider hints
-        claude_hints = sum(1 for f in fragments if f.provider_hint == "claude" and f.contains_sensitive_data)
         if claude_hints > 0:
             score += 0.2
 
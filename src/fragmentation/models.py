@@ -2,6 +2,7 @@
 Data models for query fragmentation
 """
 
+import itertools
 import uuid
 from datetime import datetime
 from enum import Enum
@@ -9,6 +10,16 @@ from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, Field
 
+# Fragment IDs are a per-process random prefix plus a counter: unique across
+# processes without drawing from os.urandom for every fragment
+_PROCESS_NONCE = uuid.uuid4().hex[:8]
+_FRAGMENT_COUNTER = itertools.count()
+
+
+def _next_fragment_id() -> str:
+    """Generate a process-unique fragment ID"""
+    return f"{_PROCESS_NONCE}-{next(_FRAGMENT_COUNTER):012x}"
+
 
 class FragmentationStrategy(Enum):
     """Enumeration of available fragmentation strategies"""
@@ -36,7 +47,7 @@ class FragmentationType(Enum):
 class QueryFragment(BaseModel):
     """Represents a fragment of a query"""
 
-    fragment_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    fragment_id: str = Field(default_factory=_next_fragment_id)
     content: str = Field(..., description="The fragment content")
     fragment_type: FragmentationType = Field(default=FragmentationType.GENERAL, description="Type of fragment")
     contains_sensitive_data: bool = Field(default=False, description="Whether fragment contains sensitive data")
@@ -85,6 +96,10 @@ class FragmentationConfig(BaseModel):
     preserve_pii_context: bool = Field(default=False, description="Keep minimal context around PII")
     high_sensitivity_threshold: float = Field(default=0.8, description="Threshold for maximum isolation")
     enable_semantic_chunking: bool = Field(default=True, description="Use semantic boundaries for splitting")
+    enable_fast_precheck: bool = Field(default=False, description="Skip detection for short all-lowercase plain-text queries")
+    use_uuid_fragment_ids: bool = Field(default=False, description="Generate random UUID4 fragment IDs instead of counter-based IDs")
+    emit_metrics: bool = Field(default=True, description="Time each fragmentation step and include metrics in result metadata")
+    emit_full_metadata: bool = Field(default=False, description="Include detection report and config dumps in result metadata")
 
     class Config:
         validate_assignment = True
@@ -97,6 +112,7 @@ class FragmentationRequest(BaseModel):
     config: Optional[FragmentationConfig] = Field(None, description="Custom fragmentation configuration")
     force_strategy: Optional[FragmentationStrategy] = Field(None, description="Force use of specific strategy")
     provider_preferences: Dict[str, float] = Field(default_factory=dict, description="Provider preference weights")
+    bypass_cache: bool = Field(default=False, description="Always run detection instead of reusing a cached report")
 
     class Config:
         use_enum_values = True
@@ -7,10 +7,12 @@ the entire privacy-preserving LLM query fragmentation workflow.
 
 from src.orchestrator.intelligence import CostOptimizer, PerformanceMonitor, PrivacyIntelligence
 from src.orchestrator.models import (
+    AggregationStrategy,
     OrchestrationConfig,
     OrchestrationMetrics,
     OrchestrationRequest,
     OrchestrationResponse,
+    OrchestratorOverloadedError,
     ProcessingStage,
 )
 from src.orchestrator.orchestrator import QueryOrchestrator
@@ -23,7 +25,9 @@ __all__ = [
     "OrchestrationConfig",
     "ProcessingStage",
     "OrchestrationMetrics",
+    "OrchestratorOverloadedError",
     "ResponseAggregator",
+    "AggregationStrategy",
     "PrivacyIntelligence",
     "CostOptimizer",
     "PerformanceMonitor"
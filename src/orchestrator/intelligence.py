@@ -2,14 +2,18 @@
 Intelligence components for privacy-aware routing, cost optimization, and performance monitoring
 """
 
+import heapq
 import logging
-from collections import defaultdict
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+import time
+from bisect import bisect_right
+from collections import defaultdict, deque
+from operator import itemgetter
+from typing import Any, ClassVar, Mapping, NamedTuple, Optional, Sequence
 
 from src.detection.models import DetectionReport
 from src.fragmentation.models import FragmentationType, QueryFragment
 from src.orchestrator.models import (
+    SENSITIVE_PRIVACY_LEVELS,
     FragmentProcessingResult,
     IntelligenceDecision,
     OrchestrationRequest,
@@ -19,22 +23,170 @@ from src.providers.models import ProviderType
 
 logger = logging.getLogger(__name__)
 
+# Privacy score contributed by the user-specified privacy level
+_LEVEL_SCORES = {
+    PrivacyLevel.PUBLIC: 0.0,
+    PrivacyLevel.INTERNAL: 0.2,
+    PrivacyLevel.CONFIDENTIAL: 0.5,
+    PrivacyLevel.RESTRICTED: 0.8,
+    PrivacyLevel.TOP_SECRET: 1.0
+}
+
+# Base sensitivity of each fragment type
+_TYPE_SCORES = {
+    FragmentationType.PII: 0.8,
+    FragmentationType.CODE: 0.7,
+    FragmentationType.SEMANTIC: 0.3,
+    FragmentationType.GENERAL: 0.1
+}
+
+# Privacy score band boundaries and the recommendation for each band, lowest first
+_PRIVACY_THRESHOLDS = (0.4, 0.6, 0.8)
+_PRIVACY_RECOMMENDATIONS = (
+    "standard_routing_acceptable",
+    "use_standard_privacy_measures",
+    "prefer_privacy_focused_providers",
+    "require_top_tier_privacy_providers"
+)
+
+# Fragment types that count as sensitive for the privacy level assessment
+_SENSITIVE_TYPES = frozenset({FragmentationType.PII, FragmentationType.CODE})
+
+# PII entity types that always raise a compliance issue
+_HIGH_RISK_PII = frozenset({"CREDIT_CARD", "US_SSN", "US_PASSPORT"})
+
+# Budget compliance reasoning, formatted with (total estimated cost, budget)
+_BUDGET_OK_TEMPLATE = "Total estimated cost ${:.4f} within budget ${:.4f}"
+_BUDGET_EXCEEDED_TEMPLATE = (
+    "Total estimated cost ${:.4f} exceeds budget ${:.4f}. "
+    "Consider reducing fragment complexity or using cheaper providers."
+)
+# Finish reason of a successful response. LLMResponse interns finish_reason, so the
+# equality check below resolves on the identity fast path.
+_STOP = "stop"
+
+# Number of cost options kept per fragment: the selection plus two alternatives
+_COST_OPTIONS_KEPT = 3
+_RATIO_PER_1K = itemgetter(3)
+
+# Routing recommendation, recommended providers and reasoning for each sensitivity tier.
+# Provider tuples are immutable, so every decision can share them.
+_ROUTE_HIGH: tuple[str, tuple[str, ...], str] = (
+    "route_to_anthropic",
+    (ProviderType.ANTHROPIC.value,),
+    "High sensitivity detected - routing to privacy-focused providers only"
+)
+_ROUTE_MEDIUM: tuple[str, tuple[str, ...], str] = (
+    "route_to_anthropic,openai",
+    (ProviderType.ANTHROPIC.value, ProviderType.OPENAI.value),
+    "Medium sensitivity - preferring privacy-focused providers"
+)
+_ROUTE_LOW: tuple[str, tuple[str, ...], str] = (
+    "route_to_anthropic,openai,google",
+    (ProviderType.ANTHROPIC.value, ProviderType.OPENAI.value, ProviderType.GOOGLE.value),
+    "Low sensitivity - all providers acceptable"
+)
+
+
+class _CostOption(NamedTuple):
+    """Cost estimate for routing one fragment to one provider"""
+    provider: ProviderType
+    cost_estimate: float
+    performance_score: float
+    cost_performance_ratio: float
+    estimated_tokens: int
+
+
+class FragmentScan(NamedTuple):
+    """Per-fragment values shared by privacy and cost analysis, in fragment order"""
+    sensitivities: list[float]
+    tokens: list[int]
+    sensitive_count: int
+
+
+def _fragment_sensitivity(fragment: QueryFragment) -> float:
+    """Calculate sensitivity score for a fragment"""
+    sensitivity = _TYPE_SCORES.get(fragment.fragment_type, 0.1)
+
+    # Content-based sensitivity
+    metadata = fragment.metadata
+    if metadata.get("contains_pii"):
+        sensitivity += 0.4
+    if metadata.get("contains_code"):
+        sensitivity += 0.3
+
+    return min(sensitivity, 1.0)
+
+
+def _estimate_tokens(content: str) -> int:
+    """Estimate tokens for fragment content"""
+    # Simple estimation: 4 characters per token
+    return len(content) // 4 + 10  # Add some overhead
+
+
+def _estimate_tokens_batch(fragments: list[QueryFragment]) -> list[int]:
+    """Estimate tokens for every fragment in one pass over the content lengths"""
+    return [len(f.content) // 4 + 10 for f in fragments]
+
+
+def scan_fragments(fragments: list[QueryFragment]) -> FragmentScan:
+    """
+    Compute sensitivity, token estimate and sensitive-type count in one pass
+
+    Args:
+        fragments: Query fragments to be processed
+
+    Returns:
+        FragmentScan to pass to privacy and cost analysis
+    """
+    sensitivities = []
+    tokens = []
+    sensitive_count = 0
+
+    for fragment in fragments:
+        if fragment.fragment_type in _SENSITIVE_TYPES:
+            sensitive_count += 1
+        sensitivities.append(_fragment_sensitivity(fragment))
+        tokens.append(_estimate_tokens(fragment.content))
+
+    return FragmentScan(sensitivities, tokens, sensitive_count)
+
 
 class PrivacyIntelligence:
     """
     Intelligence component for privacy-aware routing decisions
     """
 
-    def __init__(self):
-        """Initialize privacy intelligence"""
-        self.privacy_rules = self._initialize_privacy_rules()
-        self.provider_privacy_scores = self._initialize_provider_scores()
+    # Privacy routing rules
+    PRIVACY_RULES: ClassVar[dict[str, Any]] = {
+        "pii_routing": {
+            "high_risk_entities": ["CREDIT_CARD", "US_SSN", "US_PASSPORT"],
+            "preferred_providers": [ProviderType.ANTHROPIC]
+        },
+        "code_routing": {
+            "confidence_threshold": 0.7,
+            "preferred_providers": [ProviderType.ANTHROPIC, ProviderType.OPENAI]
+        },
+        "geo_restrictions": {
+            "EU": {"gdpr_compliant_only": True},
+            "US": {"hipaa_compliant_preferred": True}
+        }
+    }
+
+    # Provider privacy scores
+    PROVIDER_PRIVACY_SCORES: ClassVar[dict[ProviderType, float]] = {
+        ProviderType.ANTHROPIC: 0.95,  # Highest privacy focus
+        ProviderType.OPENAI: 0.80,     # Good privacy practices
+        ProviderType.GOOGLE: 0.70,     # Standard privacy practices
+        ProviderType.AZURE_OPENAI: 0.85  # Enterprise-focused privacy
+    }
 
     async def analyze_privacy_requirements(
         self,
         request: OrchestrationRequest,
         detection_report: DetectionReport,
-        fragments: list[QueryFragment]
+        fragments: list[QueryFragment],
+        scan: Optional[FragmentScan] = None
     ) -> list[IntelligenceDecision]:
         """
         Analyze privacy requirements and make routing decisions
@@ -43,37 +195,41 @@ class PrivacyIntelligence:
             request: Original orchestration request
             detection_report: Detection analysis results
             fragments: Query fragments to be processed
+            scan: Precomputed scan of the fragments, computed here if omitted
 
         Returns:
             List of privacy-related decisions
         """
-        decisions = []
-
         try:
-            # Analyze overall privacy level
-            privacy_decision = await self._assess_privacy_level(
-                request, detection_report, fragments
+            if scan is None:
+                scan = scan_fragments(fragments)
+
+            # One privacy level decision, one routing decision per fragment, one compliance check
+            privacy_level = request.privacy_level
+            decisions = [
+                # Analyze overall privacy level
+                self._assess_privacy_level(
+                    request, detection_report, fragments, scan.sensitive_count
+                ),
+                # Make provider routing decisions for each fragment
+                *(
+                    self._recommend_provider_routing(
+                        fragment, detection_report, privacy_level, sensitivity
+                    )
+                    for fragment, sensitivity in zip(fragments, scan.sensitivities, strict=True)
+                ),
+                # Check for privacy policy compliance
+                self._check_compliance(request, detection_report, fragments)
+            ]
+
+            logger.info(
+                "Generated %d privacy decisions for request %s",
+                len(decisions), request.request_id
             )
-            decisions.append(privacy_decision)
-
-            # Make provider routing decisions for each fragment
-            for fragment in fragments:
-                routing_decision = await self._recommend_provider_routing(
-                    fragment, detection_report, request.privacy_level
-                )
-                decisions.append(routing_decision)
-
-            # Check for privacy policy compliance
-            compliance_decision = await self._check_compliance(
-                request, detection_report, fragments
-            )
-            decisions.append(compliance_decision)
-
-            logger.info(f"Generated {len(decisions)} privacy decisions for request {request.request_id}")
             return decisions
 
         except Exception as e:
-            logger.error(f"Failed to analyze privacy requirements: {str(e)}")
+            logger.error("Failed to analyze privacy requirements: %s", e)
             # Return conservative default decision
             return [IntelligenceDecision(
                 component="privacy_intelligence",
@@ -83,11 +239,12 @@ class PrivacyIntelligence:
                 reasoning=f"Error in privacy analysis: {str(e)}. Defaulting to conservative approach."
             )]
 
-    async def _assess_privacy_level(
+    def _assess_privacy_level(
         self,
         request: OrchestrationRequest,
         detection_report: DetectionReport,
-        fragments: list[QueryFragment]
+        fragments: list[QueryFragment],
+        sensitive_fragments: Optional[int] = None
     ) -> IntelligenceDecision:
         """Assess the required privacy level for the request"""
 
@@ -107,20 +264,13 @@ class PrivacyIntelligence:
             reasoning_factors.append(f"Code detected (confidence: {detection_report.code_detection.confidence:.2f})")
 
         # Factor 3: User-specified privacy level
-        level_scores = {
-            PrivacyLevel.PUBLIC: 0.0,
-            PrivacyLevel.INTERNAL: 0.2,
-            PrivacyLevel.CONFIDENTIAL: 0.5,
-            PrivacyLevel.RESTRICTED: 0.8,
-            PrivacyLevel.TOP_SECRET: 1.0
-        }
-        user_score = level_scores.get(request.privacy_level, 0.5)
+        user_score = _LEVEL_SCORES.get(request.privacy_level, 0.5)
         privacy_score += user_score
         reasoning_factors.append(f"User privacy level: {request.privacy_level.value}")
 
         # Factor 4: Fragment sensitivity
-        sensitive_fragments = sum(1 for f in fragments
-                                if f.fragment_type in [FragmentationType.PII, FragmentationType.CODE])
+        if sensitive_fragments is None:
+            sensitive_fragments = scan_fragments(fragments).sensitive_count
         if sensitive_fragments > 0:
             fragment_score = (sensitive_fragments / len(fragments)) * 0.3
             privacy_score += fragment_score
@@ -129,15 +279,8 @@ class PrivacyIntelligence:
         # Normalize to 0-1 range
         privacy_score = min(privacy_score / 2.0, 1.0)
 
-        # Determine recommendation
-        if privacy_score >= 0.8:
-            recommendation = "require_top_tier_privacy_providers"
-        elif privacy_score >= 0.6:
-            recommendation = "prefer_privacy_focused_providers"
-        elif privacy_score >= 0.4:
-            recommendation = "use_standard_privacy_measures"
-        else:
-            recommendation = "standard_routing_acceptable"
+        # Determine recommendation; a score equal to a threshold falls in the higher band
+        recommendation = _PRIVACY_RECOMMENDATIONS[bisect_right(_PRIVACY_THRESHOLDS, privacy_score)]
 
         reasoning = f"Privacy score: {privacy_score:.2f}. Factors: {', '.join(reasoning_factors)}"
 
@@ -150,47 +293,44 @@ class PrivacyIntelligence:
             metadata={"privacy_score": privacy_score, "factors": reasoning_factors}
         )
 
-    async def _recommend_provider_routing(
+    def _recommend_provider_routing(
         self,
         fragment: QueryFragment,
         detection_report: DetectionReport,
-        privacy_level: PrivacyLevel
+        privacy_level: PrivacyLevel,
+        fragment_sensitivity: Optional[float] = None
     ) -> IntelligenceDecision:
         """Recommend provider routing for a specific fragment"""
 
-        # Analyze fragment sensitivity
-        fragment_sensitivity = self._calculate_fragment_sensitivity(fragment, detection_report)
+        # Analyze fragment sensitivity unless the caller already scanned it
+        if fragment_sensitivity is None:
+            fragment_sensitivity = self._calculate_fragment_sensitivity(fragment, detection_report)
 
         # Get provider recommendations based on sensitivity and privacy level
-        recommended_providers = []
-
-        if fragment_sensitivity >= 0.8 or privacy_level in [PrivacyLevel.RESTRICTED, PrivacyLevel.TOP_SECRET]:
+        if fragment_sensitivity >= 0.8 or privacy_level in SENSITIVE_PRIVACY_LEVELS:
             # High sensitivity - use only privacy-focused providers
-            recommended_providers = [ProviderType.ANTHROPIC]
-            reasoning = "High sensitivity detected - routing to privacy-focused providers only"
+            recommendation, recommended_providers, reasoning = _ROUTE_HIGH
         elif fragment_sensitivity >= 0.5 or privacy_level == PrivacyLevel.CONFIDENTIAL:
             # Medium sensitivity - prefer privacy-focused but allow others
-            recommended_providers = [ProviderType.ANTHROPIC, ProviderType.OPENAI]
-            reasoning = "Medium sensitivity - preferring privacy-focused providers"
+            recommendation, recommended_providers, reasoning = _ROUTE_MEDIUM
         else:
             # Low sensitivity - all providers acceptable
-            recommended_providers = [ProviderType.ANTHROPIC, ProviderType.OPENAI, ProviderType.GOOGLE]
-            reasoning = "Low sensitivity - all providers acceptable"
+            recommendation, recommended_providers, reasoning = _ROUTE_LOW
 
         return IntelligenceDecision(
             component="privacy_intelligence",
             decision_type="provider_routing",
-            recommendation=f"route_to_{','.join([p.value for p in recommended_providers])}",
+            recommendation=recommendation,
             confidence=0.85,
             reasoning=reasoning,
             metadata={
                 "fragment_id": fragment.fragment_id,
                 "sensitivity_score": fragment_sensitivity,
-                "recommended_providers": [p.value for p in recommended_providers]
+                "recommended_providers": recommended_providers
             }
         )
 
-    async def _check_compliance(
+    def _check_compliance(
         self,
         request: OrchestrationRequest,
         detection_report: DetectionReport,
@@ -201,17 +341,25 @@ class PrivacyIntelligence:
         compliance_issues = []
 
         # Check for PII handling compliance
+        # One flag is enough, so stop at the first high-risk entity
         if detection_report.has_pii:
-            for entity in detection_report.pii_entities:
-                if entity.type.value in ["CREDIT_CARD", "US_SSN", "US_PASSPORT"]:
-                    compliance_issues.append(f"High-risk PII detected: {entity.type.value}")
+            high_risk = next(
+                (
+                    entity.type.value
+                    for entity in detection_report.pii_entities
+                    if entity.type.value in _HIGH_RISK_PII
+                ),
+                None
+            )
+            if high_risk is not None:
+                compliance_issues.append(f"High-risk PII detected: {high_risk}")
 
         # Check for code compliance
         if detection_report.code_detection.has_code and detection_report.code_detection.confidence > 0.8:
             compliance_issues.append("High-confidence proprietary code detected")
 
         # Check cross-border data restrictions
-        if request.metadata.get("user_location") and request.metadata.get("user_location") == "EU":
+        if request.metadata.get("user_location") == "EU":
             compliance_issues.append("GDPR compliance required for EU user")
 
         if compliance_issues:
@@ -238,51 +386,7 @@ class PrivacyIntelligence:
         detection_report: DetectionReport
     ) -> float:
         """Calculate sensitivity score for a fragment"""
-
-        sensitivity = 0.0
-
-        # Fragment type sensitivity
-        type_scores = {
-            FragmentationType.PII: 0.8,
-            FragmentationType.CODE: 0.7,
-            FragmentationType.SEMANTIC: 0.3,
-            FragmentationType.GENERAL: 0.1
-        }
-        sensitivity += type_scores.get(fragment.fragment_type, 0.1)
-
-        # Content-based sensitivity
-        if fragment.metadata.get("contains_pii"):
-            sensitivity += 0.4
-        if fragment.metadata.get("contains_code"):
-            sensitivity += 0.3
-
-        return min(sensitivity, 1.0)
-
-    def _initialize_privacy_rules(self) -> dict[str, Any]:
-        """Initialize privacy routing rules"""
-        return {
-            "pii_routing": {
-                "high_risk_entities": ["CREDIT_CARD", "US_SSN", "US_PASSPORT"],
-                "preferred_providers": [ProviderType.ANTHROPIC]
-            },
-            "code_routing": {
-                "confidence_threshold": 0.7,
-                "preferred_providers": [ProviderType.ANTHROPIC, ProviderType.OPENAI]
-            },
-            "geo_restrictions": {
-                "EU": {"gdpr_compliant_only": True},
-                "US": {"hipaa_compliant_preferred": True}
-            }
-        }
-
-    def _initialize_provider_scores(self) -> dict[ProviderType, float]:
-        """Initialize provider privacy scores"""
-        return {
-            ProviderType.ANTHROPIC: 0.95,  # Highest privacy focus
-            ProviderType.OPENAI: 0.80,     # Good privacy practices
-            ProviderType.GOOGLE: 0.70,     # Standard privacy practices
-            ProviderType.AZURE_OPENAI: 0.85  # Enterprise-focused privacy
-        }
+        return _fragment_sensitivity(fragment)
 
 
 class CostOptimizer:
@@ -290,16 +394,38 @@ class CostOptimizer:
     Intelligence component for cost optimization decisions
     """
 
+    # Provider cost estimates (per 1K tokens)
+    PROVIDER_COSTS: ClassVar[dict[ProviderType, float]] = {
+        ProviderType.OPENAI: 0.03,      # GPT-4 pricing
+        ProviderType.ANTHROPIC: 0.025,  # Claude pricing
+        ProviderType.GOOGLE: 0.02,      # Gemini pricing
+        ProviderType.AZURE_OPENAI: 0.035  # Azure premium
+    }
+
+    # Simplified provider performance scores
+    PROVIDER_PERFORMANCE_SCORES: ClassVar[dict[ProviderType, float]] = {
+        ProviderType.OPENAI: 0.95,
+        ProviderType.ANTHROPIC: 0.90,
+        ProviderType.GOOGLE: 0.85,
+        ProviderType.AZURE_OPENAI: 0.88
+    }
+
     def __init__(self):
         """Initialize cost optimizer"""
-        self.provider_costs = self._initialize_provider_costs()
         self.cost_history = defaultdict(list)
 
+        # (cost per 1K tokens, performance score, cost/performance per 1K tokens) by provider
+        self._provider_table = {
+            provider_type: self._provider_cost_entry(provider_type)
+            for provider_type in ProviderType
+        }
+
     async def optimize_cost(
         self,
         request: OrchestrationRequest,
         fragments: list[QueryFragment],
-        available_providers: dict[str, list[ProviderType]]
+        available_providers: Mapping[str, Sequence[ProviderType]],
+        scan: Optional[FragmentScan] = None
     ) -> list[IntelligenceDecision]:
         """
         Optimize cost while maintaining quality and privacy requirements
@@ -307,37 +433,37 @@ class CostOptimizer:
         Args:
             request: Original orchestration request
             fragments: Query fragments to be processed
-            available_providers: Available providers for each fragment
+            available_providers: Available providers for each fragment (read only,
+                the sequences may be shared between fragments)
+            scan: Precomputed scan of the fragments, reused for token estimates
 
         Returns:
             List of cost optimization decisions
         """
-        decisions = []
-
         try:
             # Calculate cost estimates for different routing strategies
-            cost_analysis = await self._analyze_cost_options(
-                fragments, available_providers, request
+            cost_analysis = self._analyze_cost_options(
+                fragments, available_providers, request,
+                scan.tokens if scan is not None else None
             )
 
-            # Make routing decisions based on cost optimization
-            for fragment_id, options in cost_analysis.items():
-                optimization_decision = await self._select_cost_optimal_provider(
-                    fragment_id, options, request
-                )
-                decisions.append(optimization_decision)
+            # Make routing decisions based on cost optimization, one per analyzed fragment
+            max_cost = request.metadata.get("max_cost_per_fragment", 0.1)
+            decisions = [
+                self._select_cost_optimal_provider(fragment_id, options, request, max_cost)
+                for fragment_id, options in cost_analysis.items()
+            ]
 
             # Overall budget compliance check
-            budget_decision = await self._check_budget_compliance(
+            decisions.append(self._check_budget_compliance(
                 request, cost_analysis
-            )
-            decisions.append(budget_decision)
+            ))
 
-            logger.info(f"Generated {len(decisions)} cost optimization decisions")
+            logger.info("Generated %d cost optimization decisions", len(decisions))
             return decisions
 
         except Exception as e:
-            logger.error(f"Failed to optimize cost: {str(e)}")
+            logger.error("Failed to optimize cost: %s", e)
             return [IntelligenceDecision(
                 component="cost_optimizer",
                 decision_type="cost_optimization",
@@ -346,52 +472,50 @@ class CostOptimizer:
                 reasoning=f"Cost optimization failed: {str(e)}"
             )]
 
-    async def _analyze_cost_options(
+    def _analyze_cost_options(
         self,
         fragments: list[QueryFragment],
-        available_providers: dict[str, list[ProviderType]],
-        request: OrchestrationRequest
-    ) -> dict[str, list[dict[str, Any]]]:
+        available_providers: Mapping[str, Sequence[ProviderType]],
+        request: OrchestrationRequest,
+        fragment_tokens: Optional[list[int]] = None
+    ) -> dict[str, list[_CostOption]]:
         """Analyze cost options for each fragment"""
 
         cost_analysis = {}
-
-        for fragment in fragments:
-            fragment_options = []
-            providers = available_providers.get(fragment.fragment_id, [])
-
-            for provider_type in providers:
-                # Estimate tokens for this fragment
-                estimated_tokens = self._estimate_fragment_tokens(fragment)
-
-                # Calculate cost estimate
-                cost_estimate = self._calculate_cost(provider_type, estimated_tokens)
-
-                # Calculate performance score
-                performance_score = self._get_provider_performance_score(provider_type)
-
-                # Calculate cost-performance ratio
-                cost_performance_ratio = cost_estimate / max(performance_score, 0.1)
-
-                fragment_options.append({
-                    "provider": provider_type,
-                    "cost_estimate": cost_estimate,
-                    "performance_score": performance_score,
-                    "cost_performance_ratio": cost_performance_ratio,
-                    "estimated_tokens": estimated_tokens
-                })
-
-            # Sort by cost-performance ratio
-            fragment_options.sort(key=lambda x: x["cost_performance_ratio"])
-            cost_analysis[fragment.fragment_id] = fragment_options
+        # Provider ranking per distinct provider list; see _rank_providers
+        rankings: dict[tuple[ProviderType, ...], list[tuple[ProviderType, float, float, float]]] = {}
+
+        # Token estimates are computed once per fragment, not per provider
+        if fragment_tokens is None:
+            fragment_tokens = _estimate_tokens_batch(fragments)
+
+        for fragment, estimated_tokens in zip(fragments, fragment_tokens, strict=True):
+            providers = tuple(available_providers.get(fragment.fragment_id, ()))
+            ranked = rankings.get(providers)
+            if ranked is None:
+                ranked = rankings[providers] = self._rank_providers(providers)
+
+            # Cost estimate and cost-performance ratio both scale with tokens
+            thousands_of_tokens = estimated_tokens / 1000.0
+            cost_analysis[fragment.fragment_id] = [
+                _CostOption(
+                    provider=provider_type,
+                    cost_estimate=thousands_of_tokens * cost_per_1k,
+                    performance_score=performance_score,
+                    cost_performance_ratio=thousands_of_tokens * ratio_per_1k,
+                    estimated_tokens=estimated_tokens
+                )
+                for provider_type, cost_per_1k, performance_score, ratio_per_1k in ranked
+            ]
 
         return cost_analysis
 
-    async def _select_cost_optimal_provider(
+    def _select_cost_optimal_provider(
         self,
         fragment_id: str,
-        options: List[Dict[str, Any]],
-        request: OrchestrationRequest
+        options: list[_CostOption],
+        request: OrchestrationRequest,
+        max_cost: Optional[float] = None
     ) -> IntelligenceDecision:
         """Select the most cost-optimal provider for a fragment"""
 
@@ -408,17 +532,18 @@ class CostOptimizer:
         best_option = options[0]
 
         # Check if it fits within budget constraints
-        max_cost = request.metadata.get("max_cost_per_fragment", 0.1)
+        if max_cost is None:
+            max_cost = request.metadata.get("max_cost_per_fragment", 0.1)
 
-        if best_option["cost_estimate"] <= max_cost:
-            recommendation = f"use_provider_{best_option['provider'].value}"
-            reasoning = f"Most cost-effective option: ${best_option['cost_estimate']:.4f} " \
-                       f"with performance score {best_option['performance_score']:.2f}"
+        if best_option.cost_estimate <= max_cost:
+            recommendation = f"use_provider_{best_option.provider.value}"
+            reasoning = f"Most cost-effective option: ${best_option.cost_estimate:.4f} " \
+                       f"with performance score {best_option.performance_score:.2f}"
             confidence = 0.9
         else:
             # All options exceed budget - recommend cheapest anyway with warning
-            recommendation = f"use_provider_{best_option['provider'].value}_budget_exceeded"
-            reasoning = f"All options exceed budget. Cheapest option: ${best_option['cost_estimate']:.4f} " \
+            recommendation = f"use_provider_{best_option.provider.value}_budget_exceeded"
+            reasoning = f"All options exceed budget. Cheapest option: ${best_option.cost_estimate:.4f} " \
                        f"(budget: ${max_cost:.4f})"
             confidence = 0.6
 
@@ -430,16 +555,16 @@ class CostOptimizer:
             reasoning=reasoning,
             metadata={
                 "fragment_id": fragment_id,
-                "selected_provider": best_option["provider"].value,
-                "cost_estimate": best_option["cost_estimate"],
-                "alternatives": [opt["provider"].value for opt in options[1:3]]  # Top 3 alternatives
+                "selected_provider": best_option.provider.value,
+                "cost_estimate": best_option.cost_estimate,
+                "alternatives": [opt.provider.value for opt in options[1:3]]  # Top 3 alternatives
             }
         )
 
-    async def _check_budget_compliance(
+    def _check_budget_compliance(
         self,
         request: OrchestrationRequest,
-        cost_analysis: dict[str, list[dict[str, Any]]]
+        cost_analysis: dict[str, list[_CostOption]]
     ) -> IntelligenceDecision:
         """Check overall budget compliance"""
 
@@ -448,7 +573,7 @@ class CostOptimizer:
 
         for fragment_id, options in cost_analysis.items():
             if options:
-                best_cost = options[0]["cost_estimate"]
+                best_cost = options[0].cost_estimate
                 total_estimated_cost += best_cost
                 fragment_costs[fragment_id] = best_cost
 
@@ -456,12 +581,11 @@ class CostOptimizer:
 
         if total_estimated_cost <= max_budget:
             recommendation = "budget_compliant"
-            reasoning = f"Total estimated cost ${total_estimated_cost:.4f} within budget ${max_budget:.4f}"
+            reasoning = _BUDGET_OK_TEMPLATE.format(total_estimated_cost, max_budget)
             confidence = 0.9
         else:
             recommendation = "budget_exceeded_optimization_needed"
-            reasoning = f"Total estimated cost ${total_estimated_cost:.4f} exceeds budget ${max_budget:.4f}. " \
-                       f"Consider reducing fragment complexity or using cheaper providers."
+            reasoning = _BUDGET_EXCEEDED_TEMPLATE.format(total_estimated_cost, max_budget)
             confidence = 0.8
 
         return IntelligenceDecision(
@@ -477,35 +601,44 @@ class CostOptimizer:
             }
         )
 
+    def _rank_providers(
+        self,
+        providers: tuple[ProviderType, ...]
+    ) -> list[tuple[ProviderType, float, float, float]]:
+        """
+        Rank providers by cost-performance ratio, keeping the best few
+
+        Every fragment's ratio is its token count times the provider's ratio per
+        1K tokens, so the ranking doesn't depend on the fragment and is computed
+        once per provider list instead of once per fragment.
+        """
+        entries = []
+        for provider_type in providers:
+            entry = self._provider_table.get(provider_type)
+            if entry is None:
+                entry = self._provider_cost_entry(provider_type)
+            entries.append((provider_type, *entry))
+
+        return heapq.nsmallest(_COST_OPTIONS_KEPT, entries, key=_RATIO_PER_1K)
+
+    def _provider_cost_entry(self, provider_type: ProviderType) -> tuple[float, float, float]:
+        """Build the static cost table entry for a provider"""
+        cost_per_1k = self.PROVIDER_COSTS.get(provider_type, 0.01)
+        performance_score = self._get_provider_performance_score(provider_type)
+        return cost_per_1k, performance_score, cost_per_1k / max(performance_score, 0.1)
+
     def _estimate_fragment_tokens(self, fragment: QueryFragment) -> int:
         """Estimate tokens for a fragment"""
-        # Simple estimation: 4 characters per token
-        return len(fragment.content) // 4 + 10  # Add some overhead
+        return _estimate_tokens(fragment.content)
 
     def _calculate_cost(self, provider_type: ProviderType, tokens: int) -> float:
         """Calculate cost for a provider and token count"""
-        cost_per_1k_tokens = self.provider_costs.get(provider_type, 0.01)
+        cost_per_1k_tokens = self.PROVIDER_COSTS.get(provider_type, 0.01)
         return (tokens / 1000.0) * cost_per_1k_tokens
 
     def _get_provider_performance_score(self, provider_type: ProviderType) -> float:
         """Get performance score for a provider"""
-        # Simplified performance scores
-        scores = {
-            ProviderType.OPENAI: 0.95,
-            ProviderType.ANTHROPIC: 0.90,
-            ProviderType.GOOGLE: 0.85,
-            ProviderType.AZURE_OPENAI: 0.88
-        }
-        return scores.get(provider_type, 0.75)
-
-    def _initialize_provider_costs(self) -> dict[ProviderType, float]:
-        """Initialize provider cost estimates (per 1K tokens)"""
-        return {
-            ProviderType.OPENAI: 0.03,      # GPT-4 pricing
-            ProviderType.ANTHROPIC: 0.025,  # Claude pricing
-            ProviderType.GOOGLE: 0.02,      # Gemini pricing
-            ProviderType.AZURE_OPENAI: 0.035  # Azure premium
-        }
+        return self.PROVIDER_PERFORMANCE_SCORES.get(provider_type, 0.75)
 
 
 class PerformanceMonitor:
@@ -515,7 +648,7 @@ class PerformanceMonitor:
 
     def __init__(self):
         """Initialize performance monitor"""
-        self.performance_history = defaultdict(list)
+        self.performance_history = defaultdict(lambda: deque(maxlen=100))
         self.performance_thresholds = {
             "max_latency_ms": 30000,  # 30 seconds
             "min_success_rate": 0.95,
@@ -543,19 +676,19 @@ class PerformanceMonitor:
 
         try:
             # Analyze overall performance
-            performance_decision = await self._analyze_overall_performance(
+            performance_decision = self._analyze_overall_performance(
                 request, fragment_results, total_processing_time
             )
             decisions.append(performance_decision)
 
             # Analyze provider performance
-            provider_decisions = await self._analyze_provider_performance(
+            provider_decisions = self._analyze_provider_performance(
                 fragment_results
             )
             decisions.extend(provider_decisions)
 
             # Check for performance bottlenecks
-            bottleneck_decision = await self._identify_bottlenecks(
+            bottleneck_decision = self._identify_bottlenecks(
                 fragment_results, total_processing_time
             )
             decisions.append(bottleneck_decision)
@@ -565,14 +698,14 @@ class PerformanceMonitor:
                 "total_time": total_processing_time,
                 "fragment_count": len(fragment_results),
                 "success_rate": self._calculate_success_rate(fragment_results),
-                "timestamp": datetime.utcnow()
+                "timestamp_ns": time.monotonic_ns()
             })
 
-            logger.info(f"Generated {len(decisions)} performance monitoring decisions")
+            logger.info("Generated %d performance monitoring decisions", len(decisions))
             return decisions
 
         except Exception as e:
-            logger.error(f"Failed to monitor performance: {str(e)}")
+            logger.error("Failed to monitor performance: %s", e)
             return [IntelligenceDecision(
                 component="performance_monitor",
                 decision_type="performance_analysis",
@@ -581,7 +714,7 @@ class PerformanceMonitor:
                 reasoning=f"Performance monitoring failed: {str(e)}"
             )]
 
-    async def _analyze_overall_performance(
+    def _analyze_overall_performance(
         self,
         request: OrchestrationRequest,
         fragment_results: list[FragmentProcessingResult],
@@ -633,26 +766,29 @@ class PerformanceMonitor:
             }
         )
 
-    async def _analyze_provider_performance(
+    def _analyze_provider_performance(
         self,
         fragment_results: list[FragmentProcessingResult]
     ) -> list[IntelligenceDecision]:
         """Analyze performance by provider"""
 
-        provider_stats = defaultdict(lambda: {"times": [], "successes": 0, "total": 0})
+        # A single result only repeats the overall performance decision
+        if len(fragment_results) < 2:
+            return []
+
+        provider_stats = defaultdict(lambda: {"mean_time": 0.0, "successes": 0, "total": 0})
 
-        # Collect provider statistics
+        # Collect provider statistics, keeping a running mean of processing time
         for result in fragment_results:
-            provider_id = result.provider_id
-            provider_stats[provider_id]["times"].append(result.processing_time_ms)
-            provider_stats[provider_id]["total"] += 1
-            if result.response.finish_reason == "stop":
-                provider_stats[provider_id]["successes"] += 1
+            stats = provider_stats[result.provider_id]
+            stats["total"] += 1
+            stats["mean_time"] += (result.processing_time_ms - stats["mean_time"]) / stats["total"]
+            stats["successes"] += result.response.finish_reason == _STOP
 
         decisions = []
 
         for provider_id, stats in provider_stats.items():
-            avg_time = sum(stats["times"]) / len(stats["times"])
+            avg_time = stats["mean_time"]
             success_rate = stats["successes"] / stats["total"]
 
             # Evaluate provider performance
@@ -685,30 +821,46 @@ class PerformanceMonitor:
 
         return decisions
 
-    async def _identify_bottlenecks(
+    def _identify_bottlenecks(
         self,
         fragment_results: list[FragmentProcessingResult],
         total_processing_time: float
     ) -> IntelligenceDecision:
         """Identify performance bottlenecks"""
 
+        # Neither a slow outlier nor a provider imbalance is possible with fewer than two results
+        if len(fragment_results) < 2:
+            return IntelligenceDecision(
+                component="performance_monitor",
+                decision_type="bottleneck_analysis",
+                recommendation="no_significant_bottlenecks",
+                confidence=0.7,
+                reasoning="No significant performance bottlenecks detected",
+                metadata={"bottlenecks": []}
+            )
+
         bottlenecks = []
 
+        # Gather total time, slowest fragment and provider load in a single pass
+        total_time = 0.0
+        slowest_result = None
+        provider_counts = defaultdict(int)
+        for result in fragment_results:
+            processing_time = result.processing_time_ms
+            total_time += processing_time
+            if slowest_result is None or processing_time > slowest_result.processing_time_ms:
+                slowest_result = result
+            provider_counts[result.provider_id] += 1
+
         # Check for slow fragments
-        times = [result.processing_time_ms for result in fragment_results]
-        if times:
-            max_time = max(times)
-            avg_time = sum(times) / len(times)
+        if slowest_result is not None:
+            avg_time = total_time / len(fragment_results)
 
-            if max_time > avg_time * 2:  # Slowest fragment is 2x average
-                slowest_result = max(fragment_results, key=lambda x: x.processing_time_ms)
+            if slowest_result.processing_time_ms > avg_time * 2:  # Slowest fragment is 2x average
                 bottlenecks.append(f"Slow fragment: {slowest_result.fragment_id} "
                                  f"({slowest_result.processing_time_ms:.0f}ms)")
 
         # Check for provider imbalance
-        provider_counts = defaultdict(int)
-        for result in fragment_results:
-            provider_counts[result.provider_id] += 1
 
         if len(provider_counts) > 1:
             max_load = max(provider_counts.values())
@@ -740,13 +892,10 @@ class PerformanceMonitor:
             return 0.0
 
         successful = sum(1 for result in fragment_results
-                        if result.response.finish_reason == "stop")
+                        if result.response.finish_reason == _STOP)
         return successful / len(fragment_results)
 
     def _update_performance_history(self, request_id: str, metrics: dict[str, Any]):
         """Update performance history"""
+        # Each history is a bounded deque that keeps only the last 100 entries per request
         self.performance_history[request_id].append(metrics)
-
-        # Keep only last 100 entries per request
-        if len(self.performance_history[request_id]) > 100:
-            self.performance_history[request_id] = self.performance_history[request_id][-100:]
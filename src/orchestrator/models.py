@@ -2,17 +2,41 @@
 Data models for orchestration components
 """
 
+import asyncio
+import sys
+import time
 import uuid
+from collections import Counter
+from dataclasses import asdict, dataclass, field
 from datetime import datetime
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from itertools import chain
+from typing import Annotated, Any, Dict, List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, SkipValidation, computed_field
 
 from src.detection.models import DetectionReport
 from src.fragmentation.models import FragmentationStrategy
 from src.providers.models import LLMResponse, ProviderType
 
+# Usage-counter key for each fragmentation strategy, interned once at import
+_STRATEGY_NAMES = {strategy: sys.intern(strategy.value) for strategy in FragmentationStrategy}
+
+# Timestamps within this window of each other share one datetime
+_CLOCK_TTL_NS = 50_000_000  # 50 ms
+# (monotonic deadline in ns, cached utcnow); replaced as a whole so readers never see a torn pair
+_clock_cache: List[tuple[int, datetime]] = [(0, datetime.min)]
+
+
+def _cached_utcnow() -> datetime:
+    """Return datetime.utcnow(), reusing the last value for up to 50 ms"""
+    now_ns = time.monotonic_ns()
+    deadline, value = _clock_cache[0]
+    if now_ns >= deadline:
+        value = datetime.utcnow()
+        _clock_cache[0] = (now_ns + _CLOCK_TTL_NS, value)
+    return value
+
 
 class ProcessingStage(str, Enum):
     """Stages of query processing"""
@@ -26,6 +50,19 @@ class ProcessingStage(str, Enum):
     FAILED = "failed"
 
 
+class AggregationStrategy(str, Enum):
+    """Strategies for combining fragment responses into one answer"""
+    WEIGHTED_ENSEMBLE = "weighted_ensemble"
+    SEQUENTIAL = "sequential"
+    CONTEXTUAL = "contextual"
+    PII_REASSEMBLY = "pii_reassembly"
+    CODE_REASSEMBLY = "code_reassembly"
+    SEMANTIC_MERGE = "semantic_merge"
+
+    def __str__(self) -> str:
+        return self.value
+
+
 class PrivacyLevel(str, Enum):
     """Privacy sensitivity levels"""
     PUBLIC = "public"
@@ -35,6 +72,10 @@ class PrivacyLevel(str, Enum):
     TOP_SECRET = "top_secret"
 
 
+# Privacy levels that count as high sensitivity
+SENSITIVE_PRIVACY_LEVELS = frozenset({PrivacyLevel.RESTRICTED, PrivacyLevel.TOP_SECRET})
+
+
 class OrchestrationConfig(BaseModel):
     """Configuration for query orchestration"""
 
@@ -65,9 +106,28 @@ class OrchestrationConfig(BaseModel):
     # Performance settings
     max_concurrent_requests: int = Field(default=10, description="Maximum concurrent requests")
     request_timeout: int = Field(default=120, description="Request timeout in seconds")
+    request_deadline: float = Field(
+        default=300.0, description="Seconds a request may spend on all of its provider calls"
+    )
+    detection_workers: int = Field(
+        default=4, ge=1, description="Worker threads for blocking detection and fragmentation"
+    )
+    shutdown_timeout: float = Field(
+        default=10.0, description="Seconds to wait for active requests on shutdown"
+    )
+    max_active_requests: int = Field(
+        default=1000, description="Maximum in-flight requests before new ones are rejected"
+    )
+    enable_fragment_dedup: bool = Field(
+        default=False,
+        description="Process repeated non-sensitive fragment content once per request"
+    )
+    response_cache_size: int = Field(
+        default=0,
+        description="Provider responses kept for repeated non-sensitive fragments (0 disables)"
+    )
 
-    class Config:
-        validate_assignment = True
+    model_config = ConfigDict(validate_assignment=True, defer_build=True)
 
 
 class OrchestrationRequest(BaseModel):
@@ -97,27 +157,83 @@ class OrchestrationRequest(BaseModel):
     )
     priority: int = Field(default=5, ge=1, le=10, description="Request priority")
 
-    class Config:
-        validate_assignment = True
+    model_config = ConfigDict(validate_assignment=True, defer_build=True)
 
 
-class FragmentProcessingResult(BaseModel):
-    """Result of processing a single fragment"""
+@dataclass(slots=True)
+class RequestContext:
+    """Tracking state for a request in flight through the orchestrator"""
 
-    fragment_id: str = Field(..., description="Fragment identifier")
-    provider_id: str = Field(..., description="Provider that processed the fragment")
-    response: LLMResponse = Field(..., description="Provider response")
-    processing_time_ms: float = Field(..., description="Processing time in milliseconds")
-    cost_estimate: float = Field(default=0.0, description="Estimated cost in USD")
-    privacy_score: float = Field(default=0.0, description="Privacy handling score")
+    request_id: str
+    stage: ProcessingStage
+    start_time: float
+    fragments: Any = None  # FragmentationResult once fragmentation has run
+    results: List["FragmentProcessingResult"] = field(default_factory=list)
+    task: Optional[asyncio.Task] = None  # Task running the request, awaited on shutdown
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary for reporting"""
+        return {
+            "request_id": self.request_id,
+            "stage": self.stage,
+            "start_time": self.start_time,
+            "fragments": self.fragments,
+            "results": self.results
+        }
 
-    class Config:
-        validate_assignment = True
+
+class OrchestratorOverloadedError(Exception):
+    """Raised when the orchestrator already has the maximum number of active requests"""
+
+    def __init__(self, active_requests: int, max_active_requests: int):
+        """
+        Initialize overload error
+
+        Args:
+            active_requests: Number of requests currently in flight
+            max_active_requests: Configured limit
+        """
+        super().__init__(
+            f"Orchestrator overloaded: {active_requests} active requests "
+            f"(limit {max_active_requests})"
+        )
+        self.active_requests = active_requests
+        self.max_active_requests = max_active_requests
+
+
+@dataclass(slots=True)
+class FragmentProcessingResult:
+    """
+    Result of processing a single fragment
+
+    Built internally from provider responses, so it is a plain dataclass
+    rather than a validated model.
+    """
+
+    fragment_id: str  # Fragment identifier
+    provider_id: str  # Provider that processed the fragment
+    response: LLMResponse  # Provider response
+    processing_time_ms: float  # Processing time in milliseconds
+    cost_estimate: float = 0.0  # Estimated cost in USD
+    privacy_score: float = 0.0  # Privacy handling score
+
+    def model_dump(self) -> Dict[str, Any]:
+        """Return the result as a dict, matching the pydantic model API"""
+        return {
+            "fragment_id": self.fragment_id,
+            "provider_id": self.provider_id,
+            "response": self.response.model_dump(),
+            "processing_time_ms": self.processing_time_ms,
+            "cost_estimate": self.cost_estimate,
+            "privacy_score": self.privacy_score
+        }
 
 
 class OrchestrationResponse(BaseModel):
     """Response from query orchestration"""
 
+    model_config = ConfigDict(defer_build=True)
+
     request_id: str = Field(..., description="Original request ID")
     aggregated_response: str = Field(..., description="Final aggregated response")
 
@@ -142,46 +258,43 @@ class OrchestrationResponse(BaseModel):
     )
 
     # Metadata
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
-    metadata: Dict[str, Any] = Field(default_factory=dict)
-
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    timestamp: datetime = Field(default_factory=_cached_utcnow)
+    # Filled in by the orchestrator, not by callers, so the dict is passed through unchecked
+    metadata: Annotated[Dict[str, Any], SkipValidation] = Field(default_factory=dict)
 
 
 class OrchestrationMetrics(BaseModel):
     """Metrics for orchestration performance tracking"""
 
+    model_config = ConfigDict(defer_build=True)
+
     # Request statistics
     total_requests: int = Field(default=0, description="Total requests processed")
     successful_requests: int = Field(default=0, description="Successful requests")
     failed_requests: int = Field(default=0, description="Failed requests")
 
-    # Performance metrics
-    average_processing_time_ms: float = Field(default=0.0, description="Average processing time")
-    average_fragments_per_request: float = Field(default=0.0, description="Average fragments per request")
-    average_providers_per_request: float = Field(default=0.0, description="Average providers per request")
-
     # Cost metrics
     total_cost_usd: float = Field(default=0.0, description="Total cost in USD")
-    average_cost_per_request: float = Field(default=0.0, description="Average cost per request")
 
     # Privacy metrics
     pii_detections: int = Field(default=0, description="Total PII detections")
     code_detections: int = Field(default=0, description="Total code detections")
     high_sensitivity_requests: int = Field(default=0, description="High sensitivity requests")
 
+    # Cache metrics
+    response_cache_hits: int = Field(
+        default=0, description="Fragments answered from the response cache"
+    )
+
     # Provider usage
-    provider_usage: Dict[str, int] = Field(
-        default_factory=dict,
+    provider_usage: Counter[str] = Field(
+        default_factory=Counter,
         description="Usage count by provider"
     )
 
     # Strategy usage
-    strategy_usage: Dict[str, int] = Field(
-        default_factory=dict,
+    strategy_usage: Counter[str] = Field(
+        default_factory=Counter,
         description="Usage count by fragmentation strategy"
     )
 
@@ -189,86 +302,158 @@ class OrchestrationMetrics(BaseModel):
     last_request_time: Optional[datetime] = Field(None, description="Last request timestamp")
     last_reset_time: datetime = Field(default_factory=datetime.utcnow)
 
+    # Running sums over successful requests; the averages below are derived on read
+    _sum_processing_time_ms: float = PrivateAttr(default=0.0)
+    _sum_fragments: int = PrivateAttr(default=0)
+    _sum_providers: int = PrivateAttr(default=0)
+    # (total_requests, successful_requests, success rate) from the last success_rate() call
+    _success_rate_cache: tuple[int, int, float] = PrivateAttr(default=(0, 0, 0.0))
+
+    @computed_field(description="Average processing time")
+    @property
+    def average_processing_time_ms(self) -> float:
+        if self.successful_requests == 0:
+            return 0.0
+        return self._sum_processing_time_ms / self.successful_requests
+
+    @computed_field(description="Average fragments per request")
+    @property
+    def average_fragments_per_request(self) -> float:
+        if self.successful_requests == 0:
+            return 0.0
+        return self._sum_fragments / self.successful_requests
+
+    @computed_field(description="Average providers per request")
+    @property
+    def average_providers_per_request(self) -> float:
+        if self.successful_requests == 0:
+            return 0.0
+        return self._sum_providers / self.successful_requests
+
+    @computed_field(description="Average cost per request")
+    @property
+    def average_cost_per_request(self) -> float:
+        if self.successful_requests == 0:
+            return 0.0
+        return self.total_cost_usd / self.successful_requests
+
     def success_rate(self) -> float:
         """Calculate success rate percentage"""
-        if self.total_requests == 0:
-            return 0.0
-        return (self.successful_requests / self.total_requests) * 100.0
+        total, successful, rate = self._success_rate_cache
+        if total == self.total_requests and successful == self.successful_requests:
+            return rate
 
-    def update_metrics(self, response: OrchestrationResponse, success: bool,
+        total, successful = self.total_requests, self.successful_requests
+        rate = (successful / total) * 100.0 if total else 0.0
+        self._success_rate_cache = (total, successful, rate)
+        return rate
+
+    def update_metrics(self, response: Optional[OrchestrationResponse], success: bool,
                       processing_time_ms: float):
-        """Update metrics with new orchestration data"""
+        """Update metrics with new orchestration data; response may be None on failure"""
+        if success and response is None:
+            raise ValueError("A successful request must provide its response")
+
         self.total_requests += 1
-        self.last_request_time = datetime.utcnow()
+        self.last_request_time = _cached_utcnow()
 
-        if success:
-            self.successful_requests += 1
-        else:
+        if not success or response is None:
             self.failed_requests += 1
             return  # Don't update other metrics for failed requests
+        self.successful_requests += 1
 
-        # Update processing time
-        if self.total_requests == 1:
-            self.average_processing_time_ms = processing_time_ms
-        else:
-            self.average_processing_time_ms = (
-                (self.average_processing_time_ms * (self.successful_requests - 1) + processing_time_ms)
-                / self.successful_requests
-            )
-
-        # Update fragment metrics
-        if self.successful_requests == 1:
-            self.average_fragments_per_request = response.fragments_processed
-        else:
-            self.average_fragments_per_request = (
-                (self.average_fragments_per_request * (self.successful_requests - 1) +
-                 response.fragments_processed) / self.successful_requests
-            )
-
-        # Update provider metrics
-        if self.successful_requests == 1:
-            self.average_providers_per_request = len(response.providers_used)
-        else:
-            self.average_providers_per_request = (
-                (self.average_providers_per_request * (self.successful_requests - 1) +
-                 len(response.providers_used)) / self.successful_requests
-            )
+        # Update running sums for processing time, fragment and provider averages
+        self._sum_processing_time_ms += processing_time_ms
+        self._sum_fragments += response.fragments_processed
+        self._sum_providers += len(response.providers_used)
 
         # Update cost metrics
         self.total_cost_usd += response.total_cost_estimate
-        self.average_cost_per_request = self.total_cost_usd / self.successful_requests
 
         # Update privacy metrics
         if response.detection_report.has_pii:
             self.pii_detections += 1
         if response.detection_report.code_detection.has_code:
             self.code_detections += 1
-        if response.privacy_level_achieved in [PrivacyLevel.RESTRICTED, PrivacyLevel.TOP_SECRET]:
+        if response.privacy_level_achieved in SENSITIVE_PRIVACY_LEVELS:
             self.high_sensitivity_requests += 1
 
-        # Update provider usage
-        for provider_id in response.providers_used:
-            self.provider_usage[provider_id] = self.provider_usage.get(provider_id, 0) + 1
+        # Update provider usage; provider ids are interned when the LLMResponse is validated
+        self.provider_usage.update(response.providers_used)
 
         # Update strategy usage
-        strategy_name = response.fragmentation_strategy.value
-        self.strategy_usage[strategy_name] = self.strategy_usage.get(strategy_name, 0) + 1
-
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
-
-
-class IntelligenceDecision(BaseModel):
-    """Decision made by intelligence components"""
-
-    component: str = Field(..., description="Intelligence component that made the decision")
-    decision_type: str = Field(..., description="Type of decision")
-    recommendation: str = Field(..., description="Recommended action")
-    confidence: float = Field(..., ge=0.0, le=1.0, description="Decision confidence")
-    reasoning: str = Field(..., description="Explanation of the decision")
-    metadata: Dict[str, Any] = Field(default_factory=dict)
-
-    class Config:
-        validate_assignment = True
+        self.strategy_usage[_STRATEGY_NAMES[response.fragmentation_strategy]] += 1
+
+    def update_metrics_bulk(self, responses: List[OrchestrationResponse],
+                            failed_requests: int = 0):
+        """
+        Update metrics with a batch of orchestration data
+
+        Equivalent to calling update_metrics once per response, but accumulates
+        locally and touches the model once.
+
+        Args:
+            responses: Successful responses; each one's total_processing_time_ms
+                is used as its processing time
+            failed_requests: Number of failed requests in the same batch
+        """
+        if not responses and not failed_requests:
+            return
+
+        sum_time = 0.0
+        sum_fragments = 0
+        sum_providers = 0
+        total_cost = 0.0
+        pii = code = sensitive = 0
+        strategies: Counter[str] = Counter()
+
+        for response in responses:
+            sum_time += response.total_processing_time_ms
+            sum_fragments += response.fragments_processed
+            sum_providers += len(response.providers_used)
+            total_cost += response.total_cost_estimate
+            detection_report = response.detection_report
+            pii += detection_report.has_pii
+            code += detection_report.code_detection.has_code
+            sensitive += response.privacy_level_achieved in SENSITIVE_PRIVACY_LEVELS
+            strategies[_STRATEGY_NAMES[response.fragmentation_strategy]] += 1
+
+        self.total_requests += len(responses) + failed_requests
+        self.successful_requests += len(responses)
+        self.failed_requests += failed_requests
+        self.last_request_time = _cached_utcnow()
+
+        self._sum_processing_time_ms += sum_time
+        self._sum_fragments += sum_fragments
+        self._sum_providers += sum_providers
+        self.total_cost_usd += total_cost
+
+        self.pii_detections += pii
+        self.code_detections += code
+        self.high_sensitivity_requests += sensitive
+
+        self.provider_usage.update(
+            chain.from_iterable(response.providers_used for response in responses)
+        )
+        self.strategy_usage.update(strategies)
+
+
+@dataclass(slots=True)
+class IntelligenceDecision:
+    """
+    Decision made by intelligence components
+
+    Only created by the intelligence components themselves, so it is a plain
+    dataclass rather than a validated model.
+    """
+
+    component: str  # Intelligence component that made the decision
+    decision_type: str  # Type of decision
+    recommendation: str  # Recommended action
+    confidence: float  # Decision confidence, 0.0 to 1.0
+    reasoning: str  # Explanation of the decision
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    def model_dump(self) -> Dict[str, Any]:
+        """Return the decision as a dict, matching the pydantic model API"""
+        return asdict(self)
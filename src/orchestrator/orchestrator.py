@@ -3,27 +3,44 @@ Main orchestrator component that coordinates the entire privacy-preserving workf
 """
 
 import asyncio
+import hashlib
 import logging
 import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
 from datetime import datetime
+from functools import lru_cache
 from typing import Any
 
 from src.detection.engine import DetectionEngine
+from src.detection.models import CodeDetection, DetectionReport
 from src.fragmentation.fragmenter import QueryFragmenter
-from src.orchestrator.intelligence import CostOptimizer, PerformanceMonitor, PrivacyIntelligence
+from src.fragmentation.models import FragmentationConfig, FragmentationType
+from src.orchestrator.intelligence import (
+    CostOptimizer,
+    PerformanceMonitor,
+    PrivacyIntelligence,
+    scan_fragments,
+)
 from src.orchestrator.models import (
+    SENSITIVE_PRIVACY_LEVELS,
     FragmentProcessingResult,
     OrchestrationConfig,
     OrchestrationMetrics,
     OrchestrationRequest,
     OrchestrationResponse,
+    OrchestratorOverloadedError,
     PrivacyLevel,
     ProcessingStage,
+    RequestContext,
 )
 from src.orchestrator.response_aggregator import ResponseAggregator
 from src.providers.manager import ProviderManager
 from src.providers.models import (
     LLMRequest,
+    LLMResponse,
     ModelCapability,
     ProviderSelectionCriteria,
     ProviderType,
@@ -31,6 +48,72 @@ from src.providers.models import (
 
 logger = logging.getLogger(__name__)
 
+# Report used when detection is disabled; shared between requests, never mutated
+_EMPTY_DETECTION_REPORT = DetectionReport(
+    has_pii=False,
+    pii_entities=[],
+    pii_density=0.0,
+    code_detection=CodeDetection(
+        has_code=False,
+        language=None,
+        confidence=0.0,
+        code_blocks=[]
+    ),
+    named_entities=[],
+    sensitivity_score=0.0,
+    processing_time=0.0,
+    analyzers_used=[]
+)
+
+# Providers offered to the cost optimizer for every fragment; shared, never mutated
+_ALL_PROVIDER_TYPES = (ProviderType.OPENAI, ProviderType.ANTHROPIC, ProviderType.GOOGLE)
+
+# Fragment types that need sensitive-data handling
+_SENSITIVE_FRAGMENT_TYPES = frozenset({FragmentationType.PII, FragmentationType.CODE})
+
+# Simplified cost per 1K tokens by lowercased provider id
+_PROVIDER_COST_PER_1K = {
+    "openai": 0.03,
+    "anthropic": 0.025,
+    "google": 0.02
+}
+
+# Provider privacy scores by lowercased provider id
+_PROVIDER_PRIVACY_SCORES = {
+    "anthropic": 0.95,
+    "openai": 0.80,
+    "google": 0.70
+}
+
+
+# Provider ids and fragment types come from small fixed sets, so these lookups are
+# memoized on the raw arguments and skip the lowercasing after the first call.
+@lru_cache(maxsize=1024)
+def _provider_cost_per_1k(provider_id: str) -> float:
+    """Cost per 1K tokens for a provider"""
+    return _PROVIDER_COST_PER_1K.get(provider_id.lower(), 0.025)
+
+
+@lru_cache(maxsize=1024)
+def _privacy_score(provider_id: str, fragment_type) -> float:
+    """Privacy score for a provider handling a fragment of the given type"""
+    base_score = _PROVIDER_PRIVACY_SCORES.get(provider_id.lower(), 0.75)
+
+    # Adjust for fragment sensitivity
+    if fragment_type in _SENSITIVE_FRAGMENT_TYPES:
+        base_score *= 1.1  # Bonus for handling sensitive data well
+
+    return min(base_score, 1.0)
+
+
+@lru_cache(maxsize=256)
+def _routing_criteria(recommended_providers: tuple) -> ProviderSelectionCriteria:
+    """Selection criteria for a routing decision's recommended providers; shared, frozen"""
+    return ProviderSelectionCriteria(
+        preferred_providers=[ProviderType(p) for p in recommended_providers],
+        required_capabilities=[ModelCapability.TEXT_GENERATION]
+    )
+
 
 class QueryOrchestrator:
     """
@@ -66,11 +149,28 @@ class QueryOrchestrator:
         self.cost_optimizer = CostOptimizer()
         self.performance_monitor = PerformanceMonitor()
 
+        # Bounded pool for the blocking detection and fragmentation calls
+        self._detection_pool = ThreadPoolExecutor(
+            max_workers=config.detection_workers, thread_name_prefix="detection"
+        )
+
         # Metrics tracking
         self.metrics = OrchestrationMetrics()
 
         # Request tracking
-        self.active_requests: dict[str, dict[str, Any]] = {}
+        self.active_requests: dict[str, RequestContext] = {}
+
+        # LRU cache of provider responses for non-sensitive fragments, see _process_single_fragment
+        self._response_cache: OrderedDict[tuple, LLMResponse] = OrderedDict()
+
+        # Fallback provider selection criteria, shared by every fragment that uses them
+        self._sensitive_criteria = ProviderSelectionCriteria(
+            preferred_providers=config.sensitive_data_providers,
+            required_capabilities=[ModelCapability.TEXT_GENERATION, ModelCapability.SENSITIVE_DATA]
+        )
+        self._default_criteria = ProviderSelectionCriteria(
+            required_capabilities=[ModelCapability.TEXT_GENERATION]
+        )
 
         logger.info("Query orchestrator initialized")
 
@@ -85,58 +185,71 @@ class QueryOrchestrator:
             Orchestration response with aggregated results
 
         Raises:
+            OrchestratorOverloadedError: If max_active_requests requests are already in flight
             Exception: If processing fails at any stage
         """
-        start_time = time.time()
-        request_context = {
-            "request_id": request.request_id,
-            "stage": ProcessingStage.RECEIVED,
-            "start_time": start_time,
-            "fragments": [],
-            "results": []
-        }
+        active_count = len(self.active_requests)
+        if active_count >= self.config.max_active_requests:
+            logger.warning("Rejecting request %s: orchestrator overloaded", request.request_id)
+            raise OrchestratorOverloadedError(active_count, self.config.max_active_requests)
+
+        # Wall clock start for reporting; durations use the monotonic counter
+        start_ns = time.perf_counter_ns()
+        deadline = time.monotonic() + self.config.request_deadline
+        request_context = RequestContext(
+            request_id=request.request_id,
+            stage=ProcessingStage.RECEIVED,
+            start_time=time.time(),
+            task=asyncio.current_task()
+        )
 
         self.active_requests[request.request_id] = request_context
 
         try:
-            logger.info(f"Starting orchestration for request {request.request_id}")
-
-            # Stage 1: Detection
-            request_context["stage"] = ProcessingStage.DETECTION
-            detection_report = await self._run_detection(request)
-            logger.debug(f"Detection completed: PII={detection_report.has_pii}, Code={detection_report.code_detection.has_code}")
-
-            # Stage 2: Fragmentation
-            request_context["stage"] = ProcessingStage.FRAGMENTATION
-            fragments = await self._run_fragmentation(request, detection_report)
-            request_context["fragments"] = fragments
-            logger.debug(f"Fragmentation completed: {len(fragments.fragments)} fragments created")
+            logger.info("Starting orchestration for request %s", request.request_id)
+
+            # Stages 1-2: Detection and fragmentation. The fragmenter runs its own
+            # detection to pick a strategy, so the two stages run concurrently
+            request_context.stage = ProcessingStage.DETECTION
+            detection_report, fragments = await asyncio.gather(
+                self._run_detection(request),
+                self._run_fragmentation(request)
+            )
+            request_context.stage = ProcessingStage.FRAGMENTATION
+            request_context.fragments = fragments
+            logger.debug(
+                "Detection completed: PII=%s, Code=%s",
+                detection_report.has_pii, detection_report.code_detection.has_code
+            )
+            logger.debug("Fragmentation completed: %d fragments created", len(fragments.fragments))
 
             # Stage 3: Intelligence Analysis
-            request_context["stage"] = ProcessingStage.ROUTING
+            request_context.stage = ProcessingStage.ROUTING
             intelligence_decisions = await self._run_intelligence_analysis(
                 request, detection_report, fragments
             )
-            logger.debug(f"Intelligence analysis completed: {len(intelligence_decisions)} decisions made")
+            logger.debug(
+                "Intelligence analysis completed: %d decisions made", len(intelligence_decisions)
+            )
 
             # Stage 4: Process Fragments
-            request_context["stage"] = ProcessingStage.PROCESSING
+            request_context.stage = ProcessingStage.PROCESSING
             fragment_results = await self._process_fragments(
-                request, fragments, intelligence_decisions
+                request, fragments, intelligence_decisions, deadline
             )
-            request_context["results"] = fragment_results
-            logger.debug(f"Fragment processing completed: {len(fragment_results)} results")
+            request_context.results = fragment_results
+            logger.debug("Fragment processing completed: %d results", len(fragment_results))
 
             # Stage 5: Aggregate Responses
-            request_context["stage"] = ProcessingStage.AGGREGATION
+            request_context.stage = ProcessingStage.AGGREGATION
             aggregated_response = await self._aggregate_responses(
                 request, fragments, fragment_results
             )
             logger.debug("Response aggregation completed")
 
             # Stage 6: Complete Processing
-            request_context["stage"] = ProcessingStage.COMPLETED
-            total_time = (time.time() - start_time) * 1000  # Convert to milliseconds
+            request_context.stage = ProcessingStage.COMPLETED
+            total_time = (time.perf_counter_ns() - start_ns) / 1_000_000  # Milliseconds
 
             # Build final response
             response = await self._build_response(
@@ -150,19 +263,19 @@ class QueryOrchestrator:
             # Run performance monitoring
             await self._run_performance_monitoring(request, fragment_results, total_time)
 
-            logger.info(f"Orchestration completed for request {request.request_id} in {total_time:.0f}ms")
+            logger.info(
+                "Orchestration completed for request %s in %.0fms", request.request_id, total_time
+            )
             return response
 
         except Exception as e:
-            request_context["stage"] = ProcessingStage.FAILED
-            total_time = (time.time() - start_time) * 1000
+            request_context.stage = ProcessingStage.FAILED
+            total_time = (time.perf_counter_ns() - start_ns) / 1_000_000
 
-            logger.error(f"Orchestration failed for request {request.request_id}: {str(e)}")
+            logger.error("Orchestration failed for request %s: %s", request.request_id, e)
 
             # Update metrics for failure
-            self.metrics.total_requests += 1
-            self.metrics.failed_requests += 1
-            self.metrics.last_request_time = datetime.utcnow()
+            self.metrics.update_metrics(None, False, total_time)
 
             raise
 
@@ -174,39 +287,32 @@ class QueryOrchestrator:
         """Run detection analysis on the query"""
         try:
             if self.config.enable_pii_detection or self.config.enable_code_detection:
-                detection_report = self.detection_engine.detect(request.query)
-                return detection_report
+                # Detection is blocking regex/NER work, keep it off the event loop
+                return await asyncio.get_running_loop().run_in_executor(
+                    self._detection_pool, self.detection_engine.detect, request.query
+                )
             else:
                 # Return empty detection report if detection is disabled
-                from src.detection.models import CodeDetection, DetectionReport
-                return DetectionReport(
-                    has_pii=False,
-                    pii_entities=[],
-                    pii_density=0.0,
-                    code_detection=CodeDetection(
-                        has_code=False,
-                        language=None,
-                        confidence=0.0,
-                        code_blocks=[]
-                    ),
-                    named_entities=[],
-                    sensitivity_score=0.0,
-                    processing_time=0.0,
-                    analyzers_used=[]
-                )
+                return _EMPTY_DETECTION_REPORT
 
         except Exception as e:
-            logger.error(f"Detection failed for request {request.request_id}: {str(e)}")
+            logger.error("Detection failed for request %s: %s", request.request_id, e)
             raise
 
-    async def _run_fragmentation(self, request: OrchestrationRequest, detection_report):
-        """Run query fragmentation"""
+    async def _run_fragmentation(self, request: OrchestrationRequest, detection_report=None):
+        """
+        Run query fragmentation
+
+        The fragmenter selects its strategy from its own (cached) detection pass, so
+        detection_report is not consumed and fragmentation does not wait on the
+        detection stage. Fragmentation runs in the detection pool to keep the event
+        loop free while it overlaps with detection.
+        """
         try:
             # Determine fragmentation strategy
             strategy = request.fragmentation_strategy or self.config.default_strategy
 
             # Configure fragmentation
-            from src.fragmentation.models import FragmentationConfig
             frag_config = FragmentationConfig(
                 strategy=strategy,
                 max_fragment_size=self.config.max_fragment_size,
@@ -214,14 +320,14 @@ class QueryOrchestrator:
             )
 
             # Fragment the query
-            fragments = self.fragmenter.fragment_query(
-                request.query, frag_config
+            fragments = await asyncio.get_running_loop().run_in_executor(
+                self._detection_pool, self.fragmenter.fragment_query, request.query, frag_config
             )
 
             return fragments
 
         except Exception as e:
-            logger.error(f"Fragmentation failed for request {request.request_id}: {str(e)}")
+            logger.error("Fragmentation failed for request %s: %s", request.request_id, e)
             raise
 
     async def _run_intelligence_analysis(self, request, detection_report, fragments):
@@ -229,57 +335,92 @@ class QueryOrchestrator:
         try:
             intelligence_decisions = []
 
+            # Scan fragments once for both privacy and cost analysis
+            scan = scan_fragments(fragments.fragments)
+
             # Privacy intelligence analysis
             if self.config.enable_privacy_routing:
                 privacy_decisions = await self.privacy_intelligence.analyze_privacy_requirements(
-                    request, detection_report, fragments.fragments
+                    request, detection_report, fragments.fragments, scan
                 )
                 intelligence_decisions.extend(privacy_decisions)
 
             # Cost optimization analysis
             if self.config.enable_cost_optimization:
-                # Build available providers map
-                available_providers = {}
-                for fragment in fragments.fragments:
-                    available_providers[fragment.fragment_id] = [
-                        ProviderType.OPENAI, ProviderType.ANTHROPIC, ProviderType.GOOGLE
-                    ]
+                # Every fragment shares the same provider tuple
+                available_providers = dict.fromkeys(
+                    (fragment.fragment_id for fragment in fragments.fragments),
+                    _ALL_PROVIDER_TYPES
+                )
 
                 cost_decisions = await self.cost_optimizer.optimize_cost(
-                    request, fragments.fragments, available_providers
+                    request, fragments.fragments, available_providers, scan
                 )
                 intelligence_decisions.extend(cost_decisions)
 
             return intelligence_decisions
 
         except Exception as e:
-            logger.error(f"Intelligence analysis failed for request {request.request_id}: {str(e)}")
+            logger.error("Intelligence analysis failed for request %s: %s", request.request_id, e)
             # Return empty decisions list to continue processing
             return []
 
-    async def _process_fragments(self, request, fragments, intelligence_decisions):
-        """Process all fragments through selected providers"""
-        try:
-            # Create processing tasks
-            tasks = []
-            semaphore = asyncio.Semaphore(self.config.max_concurrent_requests)
+    async def _process_fragments(self, request, fragments, intelligence_decisions, deadline=None):
+        """
+        Process all fragments through selected providers
 
-            for fragment in fragments.fragments:
-                task = self._process_single_fragment(
-                    request, fragment, intelligence_decisions, semaphore
+        Args:
+            deadline: time.monotonic() value by which every provider call must finish,
+                shared by all fragments of the request (optional)
+        """
+        try:
+            sensitive_request = request.privacy_level in SENSITIVE_PRIVACY_LEVELS
+            privacy_level_value = request.privacy_level.value
+            routing_by_fragment = self._index_routing_decisions(intelligence_decisions)
+            fragment_list = fragments.fragments
+
+            # Index of the first fragment with the same content and routing, for
+            # repeated fragments
+            duplicate_of = (
+                self._find_duplicate_fragments(
+                    fragment_list, routing_by_fragment, sensitive_request
                 )
-                tasks.append(task)
+                if self.config.enable_fragment_dedup else {}
+            )
+
+            # A bounded pool of workers pulls fragments from a shared iterator, so at most
+            # max_concurrent_requests fragment coroutines exist at once. Each fragment
+            # handles its own failure and returns None, so one failed fragment never
+            # cancels the group.
+            results = [None] * len(fragment_list)
+            pending = [
+                (index, fragment) for index, fragment in enumerate(fragment_list)
+                if index not in duplicate_of
+            ]
+            work = iter(pending)
+
+            async def worker():
+                for index, fragment in work:
+                    results[index] = await self._process_single_fragment(
+                        request, fragment, routing_by_fragment,
+                        sensitive_request, deadline, privacy_level_value
+                    )
 
-            # Wait for all fragments to complete
-            fragment_results = await asyncio.gather(*tasks, return_exceptions=True)
+            async with asyncio.TaskGroup() as task_group:
+                for _ in range(min(self.config.max_concurrent_requests, len(pending))):
+                    task_group.create_task(worker())
+
+            # Fan each processed result out to its duplicates, keeping fragment order
+            for index, original in duplicate_of.items():
+                result = results[original]
+                if result is not None:
+                    # No provider call was made for the duplicate
+                    results[index] = replace(
+                        result, fragment_id=fragment_list[index].fragment_id, cost_estimate=0.0
+                    )
 
-            # Filter out exceptions and log them
-            valid_results = []
-            for i, result in enumerate(fragment_results):
-                if isinstance(result, Exception):
-                    logger.error(f"Fragment {fragments.fragments[i].fragment_id} failed: {str(result)}")
-                else:
-                    valid_results.append(result)
+            # Keep the successful results in fragment order
+            valid_results = [result for result in results if result is not None]
 
             if not valid_results:
                 raise Exception("All fragments failed to process")
@@ -287,91 +428,197 @@ class QueryOrchestrator:
             return valid_results
 
         except Exception as e:
-            logger.error(f"Fragment processing failed for request {request.request_id}: {str(e)}")
+            logger.error("Fragment processing failed for request %s: %s", request.request_id, e)
             raise
 
-    async def _process_single_fragment(self, request, fragment, intelligence_decisions, semaphore):
-        """Process a single fragment"""
-        async with semaphore:
-            try:
-                start_time = time.time()
+    async def _process_single_fragment(
+        self, request, fragment, routing_by_fragment, sensitive_request=None,
+        deadline=None, privacy_level_value=None
+    ):
+        """
+        Process a single fragment, returning None if it fails
 
-                # Select provider based on intelligence decisions
-                provider_selection = self._select_provider_for_fragment(
-                    fragment, intelligence_decisions, request
-                )
+        sensitive_request and privacy_level_value are the same for every fragment of
+        a request; _process_fragments computes them once and passes them in.
+        """
+        if sensitive_request is None:
+            sensitive_request = request.privacy_level in SENSITIVE_PRIVACY_LEVELS
+        if privacy_level_value is None:
+            privacy_level_value = request.privacy_level.value
 
+        try:
+            start_ns = time.perf_counter_ns()
+
+            # Select provider based on intelligence decisions
+            provider_selection = self._select_provider_for_fragment(
+                fragment, routing_by_fragment, request, sensitive_request
+            )
+            requires_sensitive_handling = (
+                sensitive_request or fragment.fragment_type in _SENSITIVE_FRAGMENT_TYPES
+            )
+
+            # Reuse a cached response for repeated non-sensitive content. Sensitive
+            # fragments, by type or by flag, are never cached so their responses
+            # are not kept around.
+            cache_key = None
+            llm_response = None
+            if (self.config.response_cache_size > 0 and not requires_sensitive_handling
+                    and not fragment.contains_sensitive_data):
+                cache_key = self._response_cache_key(fragment.content, provider_selection)
+                cached_response = self._response_cache.get(cache_key)
+                if cached_response is not None:
+                    self._response_cache.move_to_end(cache_key)
+                    # Hand out a copy with this call's id and timing, never the shared entry
+                    llm_response = cached_response.model_copy(update={
+                        "request_id": str(uuid.uuid4()),
+                        "latency_ms": 0.0,
+                        "timestamp": datetime.utcnow(),
+                        "metadata": {
+                            **cached_response.metadata,
+                            "cache_hit": True,
+                            "cached_request_id": cached_response.request_id
+                        }
+                    })
+
+            if llm_response is not None:
+                self.metrics.response_cache_hits += 1
+                cost_estimate = 0.0  # No provider call was made
+            else:
                 # Create LLM request
                 llm_request = LLMRequest(
                     prompt=fragment.content,
                     fragment_id=fragment.fragment_id,
                     max_tokens=self.config.max_fragment_size,
-                    requires_sensitive_handling=(
-                        fragment.fragment_type.value in ["pii", "code"] or
-                        request.privacy_level in [PrivacyLevel.RESTRICTED, PrivacyLevel.TOP_SECRET]
-                    ),
+                    requires_sensitive_handling=requires_sensitive_handling,
                     metadata={
                         "fragment_type": fragment.fragment_type.value,
-                        "privacy_level": request.privacy_level.value
+                        "privacy_level": privacy_level_value
                     }
                 )
 
+                # Bound the provider call by whatever is left of the request deadline
+                timeout = self.config.request_timeout
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError("Request deadline exceeded before dispatch")
+                    timeout = min(timeout, remaining)
+
                 # Process through provider manager
                 llm_response = await asyncio.wait_for(
                     self.provider_manager.process_request(llm_request, provider_selection),
-                    timeout=self.config.request_timeout
+                    timeout=timeout
                 )
 
-                processing_time = (time.time() - start_time) * 1000
+                if cache_key is not None:
+                    self._cache_response(cache_key, llm_response)
 
                 # Estimate cost (simplified)
                 cost_estimate = self._estimate_fragment_cost(
                     llm_response.provider_id, llm_response.tokens_used
                 )
 
-                return FragmentProcessingResult(
-                    fragment_id=fragment.fragment_id,
-                    provider_id=llm_response.provider_id,
-                    response=llm_response,
-                    processing_time_ms=processing_time,
-                    cost_estimate=cost_estimate,
-                    privacy_score=self._calculate_privacy_score(
-                        llm_response.provider_id, fragment.fragment_type
-                    )
+            processing_time = (time.perf_counter_ns() - start_ns) / 1_000_000
+
+            return FragmentProcessingResult(
+                fragment_id=fragment.fragment_id,
+                provider_id=llm_response.provider_id,
+                response=llm_response,
+                processing_time_ms=processing_time,
+                cost_estimate=cost_estimate,
+                privacy_score=self._calculate_privacy_score(
+                    llm_response.provider_id, fragment.fragment_type
                 )
+            )
 
-            except Exception as e:
-                logger.error(f"Failed to process fragment {fragment.fragment_id}: {str(e)}")
-                raise
+        except Exception as e:
+            logger.error("Failed to process fragment %s: %s", fragment.fragment_id, e)
+            return None
+
+    def _response_cache_key(self, content: str, criteria: ProviderSelectionCriteria) -> tuple:
+        """Build the response cache key for fragment content sent with the given criteria"""
+        return (
+            hashlib.blake2b(content.encode(), digest_size=16).digest(),
+            self.config.max_fragment_size,
+            tuple(criteria.preferred_providers),
+            tuple(criteria.required_capabilities)
+        )
+
+    def _cache_response(self, cache_key: tuple, llm_response: LLMResponse):
+        """Store a provider response, evicting the least recently used entries"""
+        self._response_cache[cache_key] = llm_response
+        while len(self._response_cache) > self.config.response_cache_size:
+            self._response_cache.popitem(last=False)
 
-    def _select_provider_for_fragment(self, fragment, intelligence_decisions, request):
-        """Select provider based on intelligence decisions"""
+    @staticmethod
+    def _find_duplicate_fragments(fragment_list, routing_by_fragment, sensitive_request):
+        """
+        Find fragments whose content and routing repeat an earlier fragment
 
-        # Look for provider routing decisions for this fragment
+        Sensitive fragments, and every fragment of a sensitive request, are always
+        processed on their own. Fragments with the same content but different
+        recommended providers are sent separately, as in the response cache key.
+
+        Returns:
+            Mapping from each duplicate's index to the index of the first fragment
+            with the same content and routing
+        """
+        if sensitive_request:
+            return {}
+
+        first_index: dict[tuple[str, tuple[str, ...] | None], int] = {}
+        duplicate_of: dict[int, int] = {}
+        for index, fragment in enumerate(fragment_list):
+            if (fragment.contains_sensitive_data
+                    or fragment.fragment_type in _SENSITIVE_FRAGMENT_TYPES):
+                continue
+            key = (fragment.content, routing_by_fragment.get(fragment.fragment_id))
+            original = first_index.setdefault(key, index)
+            if original != index:
+                duplicate_of[index] = original
+        return duplicate_of
+
+    @staticmethod
+    def _index_routing_decisions(intelligence_decisions):
+        """Map fragment ids to the provider tuple recommended by their first routing decision"""
+        routing_by_fragment: dict[str, tuple[str, ...]] = {}
         for decision in intelligence_decisions:
-            if (decision.decision_type == "provider_routing" and
-                decision.metadata.get("fragment_id") == fragment.fragment_id):
-
-                recommended_providers = decision.metadata.get("recommended_providers", [])
-                if recommended_providers:
-                    provider_types = [ProviderType(p) for p in recommended_providers]
-                    return ProviderSelectionCriteria(
-                        preferred_providers=provider_types,
-                        required_capabilities=[ModelCapability.TEXT_GENERATION]
-                    )
+            if decision.decision_type != "provider_routing":
+                continue
+            fragment_id = decision.metadata.get("fragment_id")
+            recommended_providers = decision.metadata.get("recommended_providers")
+            if fragment_id is not None and recommended_providers:
+                routing_by_fragment.setdefault(fragment_id, tuple(recommended_providers))
+        return routing_by_fragment
+
+    def _select_provider_for_fragment(
+        self, fragment, routing_by_fragment, request, sensitive_request=None
+    ):
+        """
+        Select provider based on intelligence decisions
+
+        Args:
+            fragment: Fragment to route
+            routing_by_fragment: Recommended providers by fragment id, see
+                _index_routing_decisions
+            request: Original orchestration request
+            sensitive_request: Whether the request privacy level is sensitive,
+                computed from the request if omitted
+        """
+
+        # Use the provider routing decision for this fragment, if any
+        recommended_providers = routing_by_fragment.get(fragment.fragment_id)
+        if recommended_providers:
+            return _routing_criteria(recommended_providers)
 
         # Fallback to configured sensitive data providers for sensitive fragments
-        if (fragment.fragment_type.value in ["pii", "code"] or
-            request.privacy_level in [PrivacyLevel.RESTRICTED, PrivacyLevel.TOP_SECRET]):
-            return ProviderSelectionCriteria(
-                preferred_providers=self.config.sensitive_data_providers,
-                required_capabilities=[ModelCapability.TEXT_GENERATION, ModelCapability.SENSITIVE_DATA]
-            )
+        if sensitive_request is None:
+            sensitive_request = request.privacy_level in SENSITIVE_PRIVACY_LEVELS
+        if sensitive_request or fragment.fragment_type in _SENSITIVE_FRAGMENT_TYPES:
+            return self._sensitive_criteria
 
         # Default selection criteria
-        return ProviderSelectionCriteria(
-            required_capabilities=[ModelCapability.TEXT_GENERATION]
-        )
+        return self._default_criteria
 
     async def _aggregate_responses(self, request, fragments, fragment_results):
         """Aggregate responses from all fragments"""
@@ -382,7 +629,7 @@ class QueryOrchestrator:
             return aggregated_response
 
         except Exception as e:
-            logger.error(f"Response aggregation failed for request {request.request_id}: {str(e)}")
+            logger.error("Response aggregation failed for request %s: %s", request.request_id, e)
             raise
 
     async def _build_response(
@@ -391,16 +638,27 @@ class QueryOrchestrator:
     ):
         """Build the final orchestration response"""
 
-        providers_used = list({result.provider_id for result in fragment_results})
-        total_cost = sum(result.cost_estimate for result in fragment_results)
-        total_tokens = sum(result.response.tokens_used for result in fragment_results)
+        # Gather providers, totals and the high-privacy fragment count in a single pass
+        providers = set()
+        total_cost = 0.0
+        total_tokens = 0
+        sensitive_fragments = 0
+        for result in fragment_results:
+            providers.add(result.provider_id)
+            total_cost += result.cost_estimate
+            total_tokens += result.response.tokens_used
+            if result.privacy_score >= 0.8:
+                sensitive_fragments += 1
+        providers_used = list(providers)
 
         # Determine achieved privacy level
         privacy_level_achieved = self._determine_achieved_privacy_level(
-            request, fragment_results, intelligence_decisions
+            request, sensitive_fragments, len(fragment_results)
         )
 
-        return OrchestrationResponse(
+        # Every field is already typed by the pipeline, so skip re-validating the nested
+        # detection report and fragment results
+        return OrchestrationResponse.model_construct(
             request_id=request.request_id,
             aggregated_response=aggregated_response,
             total_processing_time_ms=total_time,
@@ -421,47 +679,30 @@ class QueryOrchestrator:
                 request, fragment_results, total_time
             )
         except Exception as e:
-            logger.warning(f"Performance monitoring failed: {str(e)}")
+            logger.warning("Performance monitoring failed: %s", e)
 
     def _estimate_fragment_cost(self, provider_id: str, tokens_used: int) -> float:
         """Estimate cost for a fragment processing"""
-        # Simplified cost estimation
-        cost_per_1k_tokens = {
-            "openai": 0.03,
-            "anthropic": 0.025,
-            "google": 0.02
-        }
-
-        base_cost = cost_per_1k_tokens.get(provider_id.lower(), 0.025)
-        return (tokens_used / 1000.0) * base_cost
+        return (tokens_used / 1000.0) * _provider_cost_per_1k(provider_id)
 
     def _calculate_privacy_score(self, provider_id: str, fragment_type) -> float:
         """Calculate privacy score for fragment processing"""
-        # Provider privacy scores
-        provider_scores = {
-            "anthropic": 0.95,
-            "openai": 0.80,
-            "google": 0.70
-        }
+        return _privacy_score(provider_id, fragment_type)
 
-        base_score = provider_scores.get(provider_id.lower(), 0.75)
-
-        # Adjust for fragment sensitivity
-        if fragment_type.value in ["pii", "code"]:
-            base_score *= 1.1  # Bonus for handling sensitive data well
-
-        return min(base_score, 1.0)
+    def _determine_achieved_privacy_level(self, request, sensitive_fragments, total_fragments):
+        """
+        Determine the privacy level achieved during processing
 
-    def _determine_achieved_privacy_level(self, request, fragment_results, intelligence_decisions):
-        """Determine the privacy level achieved during processing"""
+        Args:
+            request: Original orchestration request
+            sensitive_fragments: Fragments handled with a privacy score of at least 0.8
+            total_fragments: Number of processed fragments
+        """
 
         # Check if high-privacy providers were used for sensitive data
-        sensitive_fragments = sum(1 for result in fragment_results
-                                if result.privacy_score >= 0.8)
-
-        if sensitive_fragments == len(fragment_results):
+        if sensitive_fragments == total_fragments:
             return PrivacyLevel.RESTRICTED
-        elif sensitive_fragments >= len(fragment_results) * 0.7:
+        elif sensitive_fragments >= total_fragments * 0.7:
             return PrivacyLevel.CONFIDENTIAL
         else:
             return request.privacy_level
@@ -472,18 +713,32 @@ class QueryOrchestrator:
 
     def get_active_requests(self) -> dict[str, dict[str, Any]]:
         """Get currently active requests"""
-        return self.active_requests.copy()
+        return {
+            request_id: context.to_dict()
+            for request_id, context in self.active_requests.items()
+        }
 
     async def shutdown(self):
         """Shutdown the orchestrator and clean up resources"""
         logger.info("Shutting down query orchestrator")
 
-        # Wait for active requests to complete (with timeout)
-        if self.active_requests:
-            logger.info(f"Waiting for {len(self.active_requests)} active requests to complete")
-            await asyncio.sleep(2)  # Give requests time to complete
+        # Wait for active requests to complete, cancelling any still running at the timeout
+        current_task = asyncio.current_task()
+        tasks = {
+            context.task for context in self.active_requests.values()
+            if context.task is not None and context.task is not current_task
+        }
+        if tasks:
+            logger.info("Waiting for %d active requests to complete", len(tasks))
+            _, pending = await asyncio.wait(tasks, timeout=self.config.shutdown_timeout)
+            if pending:
+                logger.warning("Cancelling %d requests still active at shutdown", len(pending))
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
 
         # Clean up
         self.active_requests.clear()
+        self._detection_pool.shutdown(wait=False, cancel_futures=True)
 
         logger.info("Query orchestrator shutdown complete")
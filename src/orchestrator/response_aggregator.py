@@ -2,16 +2,88 @@
 Response aggregation and reassembly logic with research-based enhancements
 """
 
+import asyncio
 import logging
 import re
-from typing import Dict, List, Tuple
+from functools import lru_cache
+from itertools import groupby
+from typing import Dict, List, NamedTuple, Optional, Tuple
 import math
 
 from src.fragmentation.models import FragmentationType, QueryFragment
-from src.orchestrator.models import FragmentProcessingResult, OrchestrationRequest
+from src.orchestrator.models import (
+    AggregationStrategy,
+    FragmentProcessingResult,
+    OrchestrationRequest,
+)
 
 logger = logging.getLogger(__name__)
 
+# Total response size above which aggregation runs in a worker thread; below it
+# the thread hand-off costs more than the aggregation itself
+_THREAD_OFFLOAD_CHARS = 64 * 1024
+
+# Patterns for code extraction and post-processing, compiled once
+_CODE_BLOCK_RE = re.compile(r"```(?:\w+)?\n.*?\n```", re.DOTALL)
+_INLINE_CODE_RE = re.compile(r"`[^`]+`")
+_MULTI_NEWLINE_RE = re.compile(r"\n{3,}")
+_TRANSITION_RE = re.compile(r"\b(Additionally|Furthermore|Also),\s+")
+# Sentence starts are only matched after ". " so lines inside code blocks are left alone
+_SENTENCE_START_RE = re.compile(r"(^|\. +)([^\W\d_])")
+
+
+def _capitalize_sentence_start(match: re.Match[str]) -> str:
+    """Uppercase the first letter of a sentence matched by _SENTENCE_START_RE"""
+    return f"{match.group(1)}{match.group(2).upper()}"
+
+
+# Openings that already read as a transition from the previous section
+_TRANSITION_PREFIXES = (
+    "however", "but", "on the other hand", "additionally", "furthermore", "also"
+)
+_MAX_TRANSITION_LEN = max(map(len, _TRANSITION_PREFIXES))
+
+# Bit flags recording which fragment features are present, see _summarize_fragments
+_HAS_PII = 1
+_HAS_CODE = 2
+_HAS_SEMANTIC = 4
+_HAS_CONTEXT_REFERENCES = 8
+
+
+class _FragmentSummary(NamedTuple):
+    """What aggregation needs to know about the original fragments, gathered in one pass"""
+
+    fragment_map: dict[str, QueryFragment]
+    flags: int
+    provider_hints: set[str]
+
+
+def _summarize_fragments(fragments: list[QueryFragment]) -> _FragmentSummary:
+    """Index fragments by id and collect their feature flags and provider hints"""
+    fragment_map = {}
+    flags = 0
+    provider_hints = set()
+    for fragment in fragments:
+        fragment_map[fragment.fragment_id] = fragment
+        fragment_type = fragment.fragment_type
+        if fragment_type is FragmentationType.PII:
+            flags |= _HAS_PII
+        elif fragment_type is FragmentationType.CODE:
+            flags |= _HAS_CODE
+        elif fragment_type is FragmentationType.SEMANTIC:
+            flags |= _HAS_SEMANTIC
+        if fragment.context_references:
+            flags |= _HAS_CONTEXT_REFERENCES
+        if fragment.provider_hint:
+            provider_hints.add(fragment.provider_hint)
+    return _FragmentSummary(fragment_map, flags, provider_hints)
+
+
+@lru_cache(maxsize=256)
+def _placeholder_pattern(placeholders: frozenset[str]) -> re.Pattern[str]:
+    """Alternation matching any of the placeholders, longest first to avoid partial matches"""
+    return re.compile("|".join(map(re.escape, sorted(placeholders, key=len, reverse=True))))
+
 
 class ResponseAggregator:
     """
@@ -21,15 +93,6 @@ class ResponseAggregator:
 
     def __init__(self):
         """Initialize the response aggregator"""
-        self.aggregation_strategies = {
-            "weighted_ensemble": self._weighted_ensemble_aggregation,
-            "sequential": self._sequential_aggregation,
-            "contextual": self._contextual_aggregation,
-            "pii_reassembly": self._pii_reassembly,
-            "code_reassembly": self._code_reassembly,
-            "semantic_merge": self._semantic_merge
-        }
-        
         # Provider reliability scores (based on research)
         self.provider_weights = {
             "anthropic": 0.95,  # High quality for sensitive content
@@ -52,92 +115,153 @@ class ResponseAggregator:
             request: Original orchestration request
 
         Returns:
-            Aggregated response text
+            Aggregated response text, or the fragment responses concatenated if the
+            selected strategy fails
         """
-        try:
-            logger.info(f"Aggregating {len(fragment_results)} fragment responses")
+        logger.info("Aggregating %d fragment responses", len(fragment_results))
 
-            # Sort fragments by their original order
-            sorted_results = self._sort_fragments_by_order(fragment_results, original_fragments)
+        # Gather everything needed about the fragments in one pass
+        summary = _summarize_fragments(original_fragments)
 
-            # Determine the best aggregation strategy
-            strategy = self._select_aggregation_strategy(original_fragments, request)
+        # Sort fragments by their original order
+        sorted_results = self._sort_fragments_by_order(
+            fragment_results, original_fragments, summary.fragment_map
+        )
 
-            # Apply the selected strategy
-            aggregated_response = await self.aggregation_strategies[strategy](
-                sorted_results, original_fragments, request
-            )
-
-            # Post-process the aggregated response
-            final_response = self._post_process_response(aggregated_response, request)
+        # Determine the best aggregation strategy
+        strategy = self._select_aggregation_strategy(original_fragments, request, summary)
 
-            logger.info(f"Successfully aggregated response using {strategy} strategy")
-            return final_response
+        # Apply the selected strategy and post-process. This is CPU-bound, so large
+        # responses are handled in a worker thread to keep the event loop free.
+        total_chars = sum(len(result.response.content) for result, _ in sorted_results)
 
+        # Only the strategy itself falls back to concatenation on failure; errors in
+        # sorting or selection are bugs and propagate
+        try:
+            if total_chars >= _THREAD_OFFLOAD_CHARS:
+                final_response = await asyncio.to_thread(
+                    self._aggregate_sorted, strategy, sorted_results, original_fragments, request
+                )
+            else:
+                final_response = self._aggregate_sorted(
+                    strategy, sorted_results, original_fragments, request
+                )
         except Exception as e:
-            logger.error(f"Failed to aggregate responses: {str(e)}")
+            logger.error("Failed to aggregate responses: %s", e)
             # Fallback: simple concatenation
             return self._fallback_aggregation(fragment_results)
 
+        logger.info("Successfully aggregated response using %s strategy", strategy)
+        return final_response
+
     def _sort_fragments_by_order(
         self,
         fragment_results: list[FragmentProcessingResult],
-        original_fragments: list[QueryFragment]
+        original_fragments: list[QueryFragment],
+        fragment_map: Optional[dict[str, QueryFragment]] = None
     ) -> list[tuple[FragmentProcessingResult, QueryFragment]]:
         """Sort fragment results by their original order"""
 
-        # Create a mapping from fragment ID to original fragment
-        fragment_map = {frag.fragment_id: frag for frag in original_fragments}
+        # Create a mapping from fragment ID to original fragment, unless already built
+        if fragment_map is None:
+            fragment_map = {frag.fragment_id: frag for frag in original_fragments}
 
-        # Sort results by fragment order
-        sorted_pairs = []
+        # Pair each result with its original fragment
+        pairs = []
         for result in fragment_results:
-            if result.fragment_id in fragment_map:
-                original_fragment = fragment_map[result.fragment_id]
-                sorted_pairs.append((result, original_fragment))
-
-        # Sort by fragment order
-        sorted_pairs.sort(key=lambda x: x[1].order)
-
-        return sorted_pairs
+            original_fragment = fragment_map.get(result.fragment_id)
+            if original_fragment is not None:
+                pairs.append((result, original_fragment))
+
+        # The fragmenter numbers fragments 0..n-1, so place each pair at its order
+        slots: list[Optional[tuple[FragmentProcessingResult, QueryFragment]]] = (
+            [None] * len(original_fragments)
+        )
+        for pair in pairs:
+            order = pair[1].order
+            if not 0 <= order < len(slots) or slots[order] is not None:
+                # Sparse or repeated orders, fall back to sorting
+                pairs.sort(key=lambda x: x[1].order)
+                return pairs
+            slots[order] = pair
+
+        return [pair for pair in slots if pair is not None]
 
     def _select_aggregation_strategy(
         self,
         fragments: list[QueryFragment],
-        request: OrchestrationRequest
-    ) -> str:
+        request: OrchestrationRequest,
+        summary: Optional[_FragmentSummary] = None
+    ) -> AggregationStrategy:
         """Select the best aggregation strategy based on fragment types"""
 
-        fragment_types = {frag.fragment_type for frag in fragments}
+        if summary is None:
+            summary = _summarize_fragments(fragments)
+        flags = summary.flags
 
         # For high-privacy queries, always use weighted ensemble
         if request.privacy_level.value in ["restricted", "top_secret"]:
-            return "weighted_ensemble"
+            return AggregationStrategy.WEIGHTED_ENSEMBLE
 
         # If we have multiple providers, use weighted ensemble
-        if len({frag.provider_hint for frag in fragments if frag.provider_hint}) > 1:
-            return "weighted_ensemble"
+        if len(summary.provider_hints) > 1:
+            return AggregationStrategy.WEIGHTED_ENSEMBLE
 
         # If we have PII fragments, use PII reassembly
-        if FragmentationType.PII in fragment_types:
-            return "pii_reassembly"
+        if flags & _HAS_PII:
+            return AggregationStrategy.PII_REASSEMBLY
 
         # If we have code fragments, use code reassembly
-        if FragmentationType.CODE in fragment_types:
-            return "code_reassembly"
+        if flags & _HAS_CODE:
+            return AggregationStrategy.CODE_REASSEMBLY
 
         # If we have semantic fragments, use semantic merge
-        if FragmentationType.SEMANTIC in fragment_types:
-            return "semantic_merge"
+        if flags & _HAS_SEMANTIC:
+            return AggregationStrategy.SEMANTIC_MERGE
 
         # If fragments have context relationships, use contextual
-        if any(hasattr(frag, 'context_references') and frag.context_references for frag in fragments):
-            return "contextual"
+        if flags & _HAS_CONTEXT_REFERENCES:
+            return AggregationStrategy.CONTEXTUAL
 
         # Default to weighted ensemble for better quality
-        return "weighted_ensemble"
+        return AggregationStrategy.WEIGHTED_ENSEMBLE
 
-    async def _weighted_ensemble_aggregation(
+    def _aggregate_sorted(
+        self,
+        strategy: AggregationStrategy,
+        sorted_results: list[tuple[FragmentProcessingResult, QueryFragment]],
+        original_fragments: list[QueryFragment],
+        request: OrchestrationRequest
+    ) -> str:
+        """Apply the selected strategy to the sorted results and post-process the text"""
+        aggregated_response = self._apply_strategy(
+            strategy, sorted_results, original_fragments, request
+        )
+        return self._post_process_response(aggregated_response, request)
+
+    def _apply_strategy(
+        self,
+        strategy: AggregationStrategy,
+        sorted_results: list[tuple[FragmentProcessingResult, QueryFragment]],
+        original_fragments: list[QueryFragment],
+        request: OrchestrationRequest
+    ) -> str:
+        """Run the aggregation method for the selected strategy"""
+        if strategy is AggregationStrategy.WEIGHTED_ENSEMBLE:
+            return self._weighted_ensemble_aggregation(
+                sorted_results, original_fragments, request
+            )
+        if strategy is AggregationStrategy.PII_REASSEMBLY:
+            return self._pii_reassembly(sorted_results, original_fragments, request)
+        if strategy is AggregationStrategy.CODE_REASSEMBLY:
+            return self._code_reassembly(sorted_results, original_fragments, request)
+        if strategy is AggregationStrategy.SEMANTIC_MERGE:
+            return self._semantic_merge(sorted_results, original_fragments, request)
+        if strategy is AggregationStrategy.CONTEXTUAL:
+            return self._contextual_aggregation(sorted_results, original_fragments, request)
+        return self._sequential_aggregation(sorted_results, original_fragments, request)
+
+    def _weighted_ensemble_aggregation(
         self,
         sorted_results: list[tuple[FragmentProcessingResult, QueryFragment]],
         original_fragments: list[QueryFragment],
@@ -158,7 +282,9 @@ class ResponseAggregator:
                 continue
                 
             # Calculate confidence score based on multiple factors
-            confidence_score = self._calculate_confidence_score(result, fragment, request)
+            confidence_score = self._calculate_confidence_score(
+                result, fragment, request, response_text
+            )
             
             # Get provider weight
             provider_weight = self.provider_weights.get(result.provider_id.lower(), 0.7)
@@ -194,13 +320,17 @@ class ResponseAggregator:
         self,
         result: FragmentProcessingResult,
         fragment: QueryFragment,
-        request: OrchestrationRequest
+        request: OrchestrationRequest,
+        response_text: Optional[str] = None
     ) -> float:
         """
         Calculate confidence score based on response quality indicators
+
+        response_text is the stripped response content, if the caller already has it
         """
-        
-        response_text = result.response.content.strip()
+
+        if response_text is None:
+            response_text = result.response.content.strip()
         base_score = 0.5
         
         # Factor 1: Response length (not too short, not too long)
@@ -351,7 +481,7 @@ class ResponseAggregator:
         
         return result
 
-    async def _sequential_aggregation(
+    def _sequential_aggregation(
         self,
         sorted_results: list[tuple[FragmentProcessingResult, QueryFragment]],
         original_fragments: list[QueryFragment],
@@ -365,9 +495,9 @@ class ResponseAggregator:
             if response_text:
                 responses.append(response_text)
 
-        return "\\n\\n".join(responses)
+        return "\n\n".join(responses)
 
-    async def _contextual_aggregation(
+    def _contextual_aggregation(
         self,
         sorted_results: list[tuple[FragmentProcessingResult, QueryFragment]],
         original_fragments: list[QueryFragment],
@@ -376,33 +506,30 @@ class ResponseAggregator:
         """Contextual aggregation considering fragment relationships"""
 
         response_sections = {}
+        fragment_ids = []
 
         # Process each fragment response
         for result, fragment in sorted_results:
             response_text = result.response.content.strip()
+            fragment_id = fragment.fragment_id
+            context_references = fragment.context_references
 
             # If fragment has context references, try to merge intelligently
-            if fragment.context_references:
+            if context_references:
                 # Find referenced sections and create connections
-                for ref_id in fragment.context_references:
-                    if ref_id in response_sections:
+                for ref_id in context_references:
+                    previous_text = response_sections.get(ref_id)
+                    if previous_text is not None:
                         # Create a contextual bridge
-                        bridge_text = self._create_context_bridge(
-                            response_sections[ref_id], response_text
-                        )
-                        response_text = bridge_text
+                        response_text = self._create_context_bridge(previous_text, response_text)
 
-            response_sections[fragment.fragment_id] = response_text
+            response_sections[fragment_id] = response_text
+            fragment_ids.append(fragment_id)
 
         # Reassemble in order
-        final_parts = []
-        for result, fragment in sorted_results:
-            if fragment.fragment_id in response_sections:
-                final_parts.append(response_sections[fragment.fragment_id])
-
-        return "\\n\\n".join(final_parts)
+        return "\n\n".join(response_sections[fragment_id] for fragment_id in fragment_ids)
 
-    async def _pii_reassembly(
+    def _pii_reassembly(
         self,
         sorted_results: list[tuple[FragmentProcessingResult, QueryFragment]],
         original_fragments: list[QueryFragment],
@@ -415,10 +542,11 @@ class ResponseAggregator:
         
         # Extract entity mappings from fragment metadata
         entity_mappings = {}
-        for result, fragment in sorted_results:
-            if fragment.metadata and "entity_mappings" in fragment.metadata:
+        for _result, fragment in sorted_results:
+            metadata = fragment.metadata
+            if metadata and "entity_mappings" in metadata:
                 # Reverse the mapping: placeholder -> original_text
-                for original_text, placeholder in fragment.metadata["entity_mappings"].items():
+                for original_text, placeholder in metadata["entity_mappings"].items():
                     entity_mappings[placeholder] = original_text
         
         # Process responses to restore anonymized entities
@@ -431,7 +559,8 @@ class ResponseAggregator:
                 continue
                 
             # Check if fragment was anonymized and restore entities
-            if fragment.metadata and fragment.metadata.get("is_anonymized"):
+            metadata = fragment.metadata
+            if metadata and metadata.get("is_anonymized"):
                 # Restore original entities in the response
                 restored_text = self._restore_anonymized_entities(response_text, entity_mappings)
                 processed_responses.append(restored_text)
@@ -448,7 +577,7 @@ class ResponseAggregator:
             # Multiple responses - merge while avoiding duplication
             return self._merge_coherent_responses(processed_responses)
 
-    async def _code_reassembly(
+    def _code_reassembly(
         self,
         sorted_results: list[tuple[FragmentProcessingResult, QueryFragment]],
         original_fragments: list[QueryFragment],
@@ -461,30 +590,21 @@ class ResponseAggregator:
 
         for result, fragment in sorted_results:
             response_text = result.response.content.strip()
+            if not response_text:
+                continue
 
-            if fragment.fragment_type == FragmentationType.CODE:
+            if fragment.fragment_type is FragmentationType.CODE:
                 # Extract and preserve code structure
-                code_sections = self._extract_code_sections(response_text)
-                code_blocks.extend(code_sections)
+                code_blocks.extend(self._extract_code_sections(response_text))
             else:
                 # Regular text
                 text_blocks.append(response_text)
 
-        # Reassemble with proper code formatting
-        final_response = ""
-
-        # Add text sections first
-        if text_blocks:
-            final_response += "\\n\\n".join(text_blocks)
-            final_response += "\\n\\n"
-
-        # Add code sections with proper formatting
-        if code_blocks:
-            final_response += "\\n\\n".join(code_blocks)
+        # Text sections first, then code sections with proper formatting, in one join
+        text_blocks.extend(code_blocks)
+        return "\n\n".join(text_blocks)
 
-        return final_response.strip()
-
-    async def _semantic_merge(
+    def _semantic_merge(
         self,
         sorted_results: list[tuple[FragmentProcessingResult, QueryFragment]],
         original_fragments: list[QueryFragment],
@@ -507,49 +627,29 @@ class ResponseAggregator:
                 merged_section = self._merge_related_responses(group_responses)
                 merged_sections.append(merged_section)
 
-        return "\\n\\n".join(merged_sections)
+        return "\n\n".join(merged_sections)
 
     def _create_context_bridge(self, previous_text: str, current_text: str) -> str:
         """Create a contextual bridge between two text sections"""
 
-        # Simple approach: look for common themes or transitions
-        if current_text.lower().startswith(("however", "but", "on the other hand")):
-            return current_text
-        elif current_text.lower().startswith(("additionally", "furthermore", "also")):
+        # Simple approach: look for common themes or transitions, lowercasing only
+        # as much of the text as the longest transition needs
+        if current_text[:_MAX_TRANSITION_LEN].lower().startswith(_TRANSITION_PREFIXES):
             return current_text
-        else:
-            # Add a smooth transition
-            return f"Building on the previous point, {current_text.lower()}"
-
-    def _restore_pii_placeholders(self, text: str, pii_mappings: dict[str, str]) -> str:
-        """Restore PII placeholders with original values"""
-
-        restored_text = text
-        for placeholder, original_value in pii_mappings.items():
-            restored_text = restored_text.replace(placeholder, original_value)
 
-        return restored_text
+        # Add a smooth transition, lowercasing only the first character
+        return f"Building on the previous point, {current_text[:1].lower()}{current_text[1:]}"
 
     def _extract_code_sections(self, text: str) -> list[str]:
         """Extract code sections from response text"""
 
-        # Look for code blocks (markdown format)
-        code_pattern = r"```(?:\\w+)?\\n(.*?)\\n```"
-        code_blocks = re.findall(code_pattern, text, re.DOTALL)
+        # Look for code blocks (markdown format). The patterns have no groups, so
+        # each match is the original fenced span, reused without re-formatting.
+        all_code = _CODE_BLOCK_RE.findall(text)
 
-        # Also look for inline code
-        inline_pattern = r"`([^`]+)`"
-        inline_code = re.findall(inline_pattern, text)
-
-        all_code = []
-
-        # Add code blocks with proper formatting
-        for block in code_blocks:
-            all_code.append(f"```\\n{block}\\n```")
-
-        # Add inline code if no blocks found
-        if not code_blocks and inline_code:
-            all_code.extend([f"`{code}`" for code in inline_code])
+        # Fall back to inline code only if no blocks were found
+        if not all_code:
+            all_code = _INLINE_CODE_RE.findall(text)
 
         return all_code if all_code else [text]
 
@@ -560,23 +660,10 @@ class ResponseAggregator:
         """Group fragments by semantic similarity"""
 
         # Simple approach: group consecutive fragments of the same type
-        groups = []
-        current_group = []
-        current_type = None
-
-        for result, fragment in sorted_results:
-            if fragment.fragment_type != current_type:
-                if current_group:
-                    groups.append(current_group)
-                current_group = [(result, fragment)]
-                current_type = fragment.fragment_type
-            else:
-                current_group.append((result, fragment))
-
-        if current_group:
-            groups.append(current_group)
-
-        return groups
+        return [
+            list(group)
+            for _, group in groupby(sorted_results, key=lambda pair: pair[1].fragment_type)
+        ]
 
     def _merge_related_responses(self, responses: list[str]) -> str:
         """Merge semantically related responses"""
@@ -585,29 +672,23 @@ class ResponseAggregator:
         if len(responses) == 1:
             return responses[0]
 
-        merged = responses[0]
-        for i, response in enumerate(responses[1:], 1):
-            # Add transition words
-            if i == len(responses) - 1:
-                merged += f"\\n\\nFinally, {response}"
-            else:
-                merged += f"\\n\\nAdditionally, {response}"
+        parts = [responses[0]]
+        parts.extend(f"Additionally, {response}" for response in responses[1:-1])
+        parts.append(f"Finally, {responses[-1]}")
 
-        return merged
+        return "\n\n".join(parts)
 
     def _post_process_response(self, response: str, request: OrchestrationRequest) -> str:
         """Post-process the aggregated response"""
 
         # Clean up multiple newlines
-        cleaned = re.sub(r"\\n{3,}", "\\n\\n", response)
+        cleaned = _MULTI_NEWLINE_RE.sub("\n\n", response)
 
         # Remove redundant phrases
-        cleaned = re.sub(r"\\b(Additionally|Furthermore|Also),\\s+", "", cleaned)
+        cleaned = _TRANSITION_RE.sub("", cleaned)
 
-        # Ensure proper capitalization
-        sentences = cleaned.split(". ")
-        capitalized = [sent.capitalize() if sent and sent[0].islower() else sent for sent in sentences]
-        cleaned = ". ".join(capitalized)
+        # Ensure each sentence starts with a capital letter, leaving the rest untouched
+        cleaned = _SENTENCE_START_RE.sub(_capitalize_sentence_start, cleaned)
 
         return cleaned.strip()
 
@@ -622,16 +703,12 @@ class ResponseAggregator:
         Returns:
             Text with original entities restored
         """
-        restored_text = text
-        
-        # Sort by placeholder length (longest first) to avoid partial replacements
-        sorted_mappings = sorted(entity_mappings.items(), key=lambda x: len(x[0]), reverse=True)
-        
-        for placeholder, original_text in sorted_mappings:
-            # Replace placeholder with original text
-            restored_text = restored_text.replace(placeholder, original_text)
-        
-        return restored_text
+        if not entity_mappings:
+            return text
+
+        # Replace every placeholder in a single scan of the text
+        pattern = _placeholder_pattern(frozenset(entity_mappings))
+        return pattern.sub(lambda match: entity_mappings[match.group(0)], text)
     
     def _merge_coherent_responses(self, responses: list[str]) -> str:
         """
@@ -641,35 +718,45 @@ class ResponseAggregator:
         if not responses:
             return ""
         
-        # For semantic chunks, concatenate with natural transitions
-        merged = responses[0]
-        
+        # For semantic chunks, concatenate with natural transitions. The merged
+        # words are tracked as a set so each overlap check avoids re-splitting
+        # everything merged so far.
+        parts = [responses[0]]
+        merged_words = set(responses[0].lower().split())
+
         for response in responses[1:]:
+            response_words = set(response.lower().split())
             # Check for content overlap to avoid redundancy
-            if not self._has_significant_overlap(merged, response):
+            if not self._has_significant_word_overlap(merged_words, response_words):
                 # Add transition and append
-                if not merged.endswith(('.', '!', '?')):
-                    merged += "."
-                merged += " " + response
-        
-        return merged.strip()
+                if not parts[-1].endswith(('.', '!', '?')):
+                    parts[-1] += "."
+                parts.append(response)
+                merged_words |= response_words
+
+        return " ".join(parts).strip()
     
     def _has_significant_overlap(self, text1: str, text2: str) -> bool:
         """
         Check if two text fragments have significant content overlap.
         """
-        words1 = set(text1.lower().split())
-        words2 = set(text2.lower().split())
-        
+        return self._has_significant_word_overlap(
+            set(text1.lower().split()), set(text2.lower().split())
+        )
+
+    @staticmethod
+    def _has_significant_word_overlap(words1: set, words2: set) -> bool:
+        """
+        Check if two sets of lowercased words have significant overlap.
+        """
         if not words1 or not words2:
             return False
-            
-        intersection = words1.intersection(words2)
-        union = words1.union(words2)
-        
+
+        intersection_size = len(words1 & words2)
+        union_size = len(words1) + len(words2) - intersection_size
+
         # Consider >70% overlap as significant
-        similarity = len(intersection) / len(union) if union else 0
-        return similarity > 0.7
+        return intersection_size / union_size > 0.7
 
     def _restore_pii_placeholders(self, text: str, pii_mappings: dict) -> str:
         """
@@ -689,4 +776,4 @@ class ResponseAggregator:
             if content:
                 responses.append(content)
 
-        return "\\n\\n".join(responses) if responses else "Unable to process the request."
+        return "\n\n".join(responses) if responses else "Unable to process the request."
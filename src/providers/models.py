@@ -2,12 +2,13 @@
 Data models for LLM providers
 """
 
+import sys
 import uuid
 from datetime import datetime
 from enum import Enum
 from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
 
 class ProviderType(str, Enum):
@@ -129,10 +130,11 @@ class LLMResponse(BaseModel):
     timestamp: datetime = Field(default_factory=datetime.utcnow)
     metadata: Dict[str, Any] = Field(default_factory=dict, description="Provider-specific metadata")
 
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    @field_validator('provider_id', 'finish_reason')
+    @classmethod
+    def intern_identifier(cls, v):
+        # Small fixed vocabularies compared and grouped on every fragment downstream
+        return sys.intern(v)
 
 
 class ProviderError(Exception):
@@ -205,7 +207,8 @@ class ProviderSelectionCriteria(BaseModel):
     privacy_level: str = Field(default="standard", description="Privacy requirement level")
 
     class Config:
-        validate_assignment = True
+        # Frozen so that one criteria instance can be shared across requests
+        frozen = True
 
 
 class ProviderHealth(BaseModel):
@@ -63,8 +63,9 @@ class TestQueryFragmenter:
     def test_fragmenter_initialization(self, fragmenter):
         """Test that fragmenter initializes correctly"""
         assert fragmenter is not None
-        assert hasattr(fragmenter, 'strategies')
-        assert len(fragmenter.strategies) > 0
+        assert len(fragmenter._STRATEGY_METHODS) > 0
+        for method_name in fragmenter._STRATEGY_METHODS.values():
+            assert callable(getattr(fragmenter, method_name))
     
     def test_fragment_query_with_no_sensitive_data(self, fragmenter):
         """Test fragmenting a query with no sensitive data"""
@@ -234,6 +235,47 @@ class TestQueryFragmenter:
         # Verify anonymization placeholders exist
         assert "PERSON" in full_text or "SSN" in full_text or "DATE" in full_text
     
+    def test_maximum_isolation_with_code_reuses_detection(self, fragmenter):
+        """Test that PII in text around code is anonymized without re-running detection"""
+        code = "```python\nprint('hello')\n```"
+        query = f"Ask John Doe to review this:\n{code}"
+        code_start = query.index(code)
+        
+        mock_detection = DetectionReport(
+            has_pii=True,
+            pii_entities=[
+                PIIEntity(text="John Doe", type=PIIEntityType.PERSON, start=4, end=12, score=0.9)
+            ],
+            pii_density=0.2,
+            code_detection=CodeDetection(
+                has_code=True,
+                language="python",
+                confidence=0.9,
+                code_blocks=[{
+                    "content": "print('hello')",
+                    "language": "python",
+                    "start": code_start,
+                    "end": code_start + len(code),
+                    "confidence": 0.9
+                }]
+            ),
+            named_entities=[],
+            sensitivity_score=0.9,
+            processing_time=20.0,
+            analyzers_used=["presidio", "code"],
+            recommended_strategy="maximum_isolation",
+            requires_orchestrator=True
+        )
+        
+        with patch('src.detection.engine.DetectionEngine.detect', return_value=mock_detection) as mock_detect:
+            result = fragmenter.fragment_query(query)
+        
+        assert mock_detect.call_count == 1
+        assert result.strategy_used == "maximum_isolation"
+        assert "PERSON_1" in result.fragments[0].content
+        assert all("John Doe" not in f.content for f in result.fragments)
+        assert [f.order for f in result.fragments] == list(range(len(result.fragments)))
+    
     def test_get_fragmentation_strategy(self, fragmenter, sample_detection_report):
         """Test strategy selection logic"""
         # Test high sensitivity
@@ -345,6 +387,77 @@ class TestQueryFragmenter:
         total_content = "".join(f.content for f in result.fragments)
         assert len(total_content) >= len(long_query.strip()) * 0.99  # Allow 1% loss
 
+    
+    def test_detection_cached_for_repeated_queries(self, fragmenter, sample_detection_report):
+        """Test that repeated queries reuse the cached detection report"""
+        from src.fragmentation.models import FragmentationRequest
+        
+        query = "Hello, my name is John Doe and email is john@example.com"
+        
+        with patch('src.detection.engine.DetectionEngine.detect', return_value=sample_detection_report) as mock_detect:
+            first = fragmenter.fragment_query(query)
+            forced = fragmenter.fragment_request(
+                FragmentationRequest(query=query, force_strategy=FragmentationStrategy.PII_ISOLATION)
+            )
+            assert mock_detect.call_count == 1
+            
+            fragmenter.fragment_query(query, bypass_cache=True)
+            assert mock_detect.call_count == 2
+        
+        assert forced.strategy_used == "pii_isolation"
+        assert [f.content for f in forced.fragments] == [f.content for f in first.fragments]
+    
+    def test_fragment_batch_detects_each_query_once(self, fragmenter, sample_detection_report):
+        """Test that batch fragmentation dedupes detection and keeps request order"""
+        from src.fragmentation.models import FragmentationRequest
+        
+        pii_query = "Hello, my name is John Doe and email is john@example.com"
+        requests = [
+            FragmentationRequest(query=pii_query),
+            FragmentationRequest(query="Another question"),
+            FragmentationRequest(query=pii_query),
+        ]
+        
+        with patch('src.detection.engine.DetectionEngine.detect', return_value=sample_detection_report) as mock_detect:
+            results = fragmenter.fragment_batch(requests, max_workers=2)
+        
+        assert mock_detect.call_count == 2
+        assert [r.original_query for r in results] == [pii_query, "Another question", pii_query]
+    
+    def test_fast_precheck_skips_detection_for_plain_text(self, sample_detection_report):
+        """Test that the opt-in precheck only bypasses detection for plain lowercase text"""
+        from src.fragmentation.models import FragmentationConfig
+        
+        fragmenter = QueryFragmenter(FragmentationConfig(enable_fast_precheck=True))
+        
+        with patch('src.detection.engine.DetectionEngine.detect', return_value=sample_detection_report) as mock_detect:
+            result = fragmenter.fragment_query("how do rainbows form?")
+            assert mock_detect.call_count == 0
+            assert result.strategy_used == "none"
+            assert result.fragments[0].content == "how do rainbows form?"
+            
+            fragmenter.fragment_query("email john@example.com")
+            fragmenter.fragment_query("what is my password")
+            assert mock_detect.call_count == 2
+    
+    def test_per_call_config_uuid_fragment_ids(self, fragmenter, sample_detection_report):
+        """Test that use_uuid_fragment_ids is honoured when passed through the per-call config"""
+        import uuid
+        from src.fragmentation.models import FragmentationConfig
+        
+        query = "Hi, I'm John Smith, email john@example.com"
+        config = FragmentationConfig(use_uuid_fragment_ids=True)
+        
+        with patch('src.detection.engine.DetectionEngine.detect', return_value=sample_detection_report):
+            result = fragmenter.fragment_query(query, config=config, bypass_cache=True)
+            default_result = fragmenter.fragment_query(query, bypass_cache=True)
+        
+        assert not fragmenter.config.use_uuid_fragment_ids
+        for fragment in result.fragments:
+            assert uuid.UUID(fragment.fragment_id).version == 4
+        for fragment in default_result.fragments:
+            with pytest.raises(ValueError):
+                uuid.UUID(fragment.fragment_id)
 
 class TestFragmentationStrategies:
     """Test fragmentation strategy enumeration"""